@@ -0,0 +1,99 @@
+"""
+Micro-benchmark of the redis value serializers
+
+Compares encode/decode throughput of a token session payload
+and of a cached 5 day forecast document.
+
+Usage:
+    cd general/service-common
+    python benchmarks/bench_serializers.py [--number 20000]
+"""
+import sys
+import timeit
+import argparse
+import decimal
+from datetime import datetime, timedelta
+from os.path import abspath, join
+
+# Adjust the paths
+sys.path.insert(0, abspath(join(__file__, "../", "../")))
+
+from service_common.adapter import serializers  # noqa: E402
+
+
+def token_payload() -> dict:
+    return {
+        'token': 'eyJhbGciOiJIUzI1NiIsInR5cCI6IkpXVCJ9.eyJzdWIiOiJhYWExMjVlNi1mZWM1LTQzY2UtODhlYi04OTE3MzljM2NhN2UifQ.'
+                 'v7ZpvLH-HrpB-l8DNjVbP7uXuRZO7bHENRJakKAJBbU',
+        't_type': 'access',
+        'user_id': 1024,
+        'user_public_id': 'aaa125e6-fec5-43ce-88eb-891739c3ca7e',
+        'is_revoked': False,
+        'user_type_map': [{'user_type': 'FARMER', 'public_id': 'aaa125e6-fec5-43ce-88eb-891739c3ca7e'}],
+    }
+
+
+def forecast_document() -> dict:
+    start = datetime(2022, 11, 10, 7)
+    daily = []
+    for day in range(5):
+        date_ = start + timedelta(days=day)
+        daily.append({
+            'Date': date_.isoformat(),
+            'EpochDate': int(date_.timestamp()),
+            'Temperature': {
+                'Minimum': {'Value': 17.4 + day / 10, 'Unit': 'C', 'UnitType': 17},
+                'Maximum': {'Value': 31.2 - day / 10, 'Unit': 'C', 'UnitType': 17},
+            },
+            'Day': {'Icon': 1, 'IconPhrase': 'Sunny', 'HasPrecipitation': False,
+                    'RainProbability': 3.0, 'Wind': {'Speed': {'Value': 9.3, 'Unit': 'km/h'}}},
+            'Night': {'Icon': 33, 'IconPhrase': 'Clear', 'HasPrecipitation': False,
+                      'RainProbability': 1.0, 'Wind': {'Speed': {'Value': 5.6, 'Unit': 'km/h'}}},
+            'Sources': ['AccuWeather'],
+            'MobileLink': 'http://www.accuweather.com/en/in/pune/204848/daily-weather-forecast/204848?lang=en-us',
+            'Link': 'http://www.accuweather.com/en/in/pune/204848/daily-weather-forecast/204848?lang=en-us',
+        })
+    return {
+        'location_key': '204848',
+        'type': 'DAILY',
+        'created_at': start.isoformat(),
+        'response': {
+            'Headline': {'EffectiveDate': start.isoformat(), 'Severity': 4, 'Text': 'Pleasant this week',
+                         'Category': 'mild', 'EndDate': None},
+            'DailyForecasts': daily,
+        },
+    }
+
+
+def bench(name: str, serializer: serializers.BaseSerializer, payload: dict, number: int):
+    encoded = serializer.dumps(payload)
+    if isinstance(encoded, str):
+        encoded = encoded.encode('utf-8')
+    encode_time = timeit.timeit(lambda: serializer.dumps(payload), number=number)
+    decode_time = timeit.timeit(lambda: serializers.loads(encoded), number=number)
+    print(f"{name:<10} {serializer.name:<8} {len(encoded):>7} "
+          f"{number / encode_time:>14,.0f} {number / decode_time:>14,.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--number', type=int, default=20000, help="Iterations per measurement")
+    args = parser.parse_args()
+
+    payloads = {'token': token_payload(), 'forecast': forecast_document()}
+    # Cached documents carry the decimals of the domain models
+    payloads['forecast']['response']['Headline']['Latitude'] = decimal.Decimal('18.5204')
+
+    print(f"{'payload':<10} {'format':<8} {'bytes':>7} {'encode ops/s':>14} {'decode ops/s':>14}")
+    for name, payload in payloads.items():
+        for serializer_name in serializers.SERIALIZERS:
+            try:
+                serializer = serializers.get_serializer(serializer_name)
+            except ImportError as e:
+                print(f"{name:<10} {serializer_name:<8} skipped: {e}")
+                continue
+            bench(name, serializer, payload, args.number)
+
+
+if __name__ == '__main__':
+    main()
@@ -2,6 +2,7 @@
 Implements the common base classes utilities
 """
 import sys
+import typing
 from itertools import islice
 from itertools import zip_longest
 import os
@@ -47,8 +48,77 @@ class BaseBackend(metaclass=Singleton):
     def find_keys(self, pattern):
         raise NotImplementedError
 
-    def scan(self, match_: str, **kwargs) -> str:
+    def scan(self, match_: str, count: int = None, **kwargs) -> typing.Iterator:
+        raise NotImplementedError
+
+    def delete_matching(self, pattern: str, batch_size: int = None) -> int:
         raise NotImplementedError
 
     def delete(self, *keys):
         raise NotImplementedError
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict:
+        raise NotImplementedError
+
+    def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        raise NotImplementedError
+
+    def delete_many(self, keys: typing.Iterable[str]):
+        raise NotImplementedError
+
+
+class AsyncBaseBackend(metaclass=Singleton):
+    """Provides Basic features for the asyncio backend
+
+    """
+
+    def __init__(self, *args, **kwargs):
+        super(AsyncBaseBackend, self).__init__()
+
+    async def set_dict(self, key, data, **kwargs):
+        raise NotImplementedError
+
+    async def get_dict(self, key):
+        raise NotImplementedError
+
+    async def set_list(self, key: str, data: list, **kwargs):
+        raise NotImplementedError
+
+    async def get_list(self, key: str):
+        raise NotImplementedError
+
+    async def set_str(self, key: str, data: str, **kwargs):
+        raise NotImplementedError
+
+    async def get_str(self, key: str):
+        raise NotImplementedError
+
+    async def scan(self, match_: str, count: int = None, **kwargs):
+        raise NotImplementedError
+
+    async def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        raise NotImplementedError
+
+    async def delete(self, *keys):
+        raise NotImplementedError
+
+    async def get_many(self, keys: typing.Iterable[str]) -> dict:
+        raise NotImplementedError
+
+    async def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        raise NotImplementedError
+
+    async def delete_many(self, keys: typing.Iterable[str]):
+        raise NotImplementedError
+
+    async def acquire_lock(self, key: str, ttl: float) -> typing.Optional[str]:
+        """
+        Takes the lock if nobody holds it
+        :param key:
+        :param ttl: float: seconds after which the lock is released if the holder did not release it
+        :return: token to release the lock with, `None` if the lock is held
+        """
+        raise NotImplementedError
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        raise NotImplementedError
@@ -0,0 +1,77 @@
+"""Provides the in-process cache used in front of the remote backends
+"""
+import time
+import typing
+import threading
+from collections import OrderedDict
+
+from logging import getLogger
+
+
+logger = getLogger(__name__)
+
+
+class LocalTTLCache:
+    """Bounded LRU cache kept in the worker memory
+
+    Every entry expires after `ttl` seconds, once `max_size` entries are stored
+    the least recently used entry is evicted.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl: float = 5):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data: typing.OrderedDict[typing.Any, typing.Tuple[float, typing.Any]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default: typing.Any = None) -> typing.Any:
+        """
+        Returns the cached value, `default` if key is missing or expired
+        :param key:
+        :param default:
+        :return:
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                return default
+            expires_at, value = item
+            if expires_at <= now:
+                # Expired entries are removed lazily on read
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value: typing.Any, ttl: float = None):
+        """
+        Stores the value, evicts the least recently used entries above `max_size`
+        :param key:
+        :param value:
+        :param ttl: Overrides the default ttl for this entry
+        :return:
+        """
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
@@ -0,0 +1,244 @@
+"""Provides the in-memory backend storage for the application
+
+Used on single node deployments and benchmark runs without a redis server.
+Values are serialized like on redis so both backends return the same data.
+"""
+import time
+import uuid
+import typing
+import fnmatch
+import threading
+from collections import OrderedDict
+
+from logging import getLogger
+
+from service_common.adapter.base import BaseBackend, AsyncBaseBackend
+from service_common.adapter.redis_adapter import RedisSerializerMixin
+from service_common.adapter.serializers import get_serializer
+from service_common.metrics import register_metrics
+
+
+logger = getLogger(__name__)
+
+
+def _key(key) -> str:
+    return key.decode('utf-8') if type(key) in [bytes, bytearray] else str(key)
+
+
+class MemoryBackend(RedisSerializerMixin, BaseBackend):
+    """Implements thread safe Backend in the process memory
+
+    Entries expire with the `ex`/`px` arguments like on redis, the least recently
+    used entries are evicted above `max_entries` entries or `max_bytes` bytes.
+    """
+
+    def __init__(self, max_entries: int = 100000, max_bytes: int = 64 * 1024 * 1024, serializer: str = None):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.serializer = get_serializer(serializer)
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._size = 0
+        self._data: typing.OrderedDict[str, typing.Tuple[typing.Optional[float], bytes]] = OrderedDict()
+        self._lock = threading.RLock()
+        register_metrics('memory_backend', self.metrics)
+
+    @staticmethod
+    def _entry_size(key: str, value: bytes) -> int:
+        return len(key) + len(value)
+
+    @staticmethod
+    def _expires_at(ex: int = None, px: int = None, **kwargs) -> typing.Optional[float]:
+        if ex:
+            return time.monotonic() + ex
+        if px:
+            return time.monotonic() + px / 1000
+        return None
+
+    def _remove(self, key: str) -> bool:
+        item = self._data.pop(key, None)
+        if item is None:
+            return False
+        self._size -= self._entry_size(key, item[1])
+        return True
+
+    def _read(self, key) -> typing.Optional[bytes]:
+        key = _key(key)
+        with self._lock:
+            item = self._data.get(key)
+            if item is not None and item[0] is not None and item[0] <= time.monotonic():
+                self._remove(key)
+                item = None
+            if item is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+            return item[1]
+
+    def _write(self, key, data, **kwargs) -> bool:
+        key = _key(key)
+        value = self._serialize(data)
+        if type(value) is str:
+            value = value.encode('utf-8')
+        expires_at = self._expires_at(**kwargs)
+        with self._lock:
+            self._remove(key)
+            self._data[key] = (expires_at, value)
+            self._size += self._entry_size(key, value)
+            self._evict()
+        return True
+
+    def _evict(self):
+        """
+        Drops the least recently used entries above the configured limits
+        :return:
+        """
+        while self._data and (len(self._data) > self.max_entries or self._size > self.max_bytes):
+            key, (_, value) = self._data.popitem(last=False)
+            self._size -= self._entry_size(key, value)
+            self.evictions += 1
+
+    def _decode(self, key, default: str):
+        tmp = self._read(key)
+        try:
+            return self._deserialize(tmp or default)
+        except ValueError as de:
+            logger.fatal(f"Error in decoding for {key} from cache: {str(de)}")
+            return tmp
+
+    def set_str(self, key, data, **kwargs) -> bool:
+        return self._write(key, data, **kwargs)
+
+    def get_str(self, key, **kwargs) -> str:
+        tmp = self._read(key)
+        return tmp.decode('utf-8') if tmp else ''
+
+    def set_dict(self, key, data, **kwargs) -> bool:
+        return self._write(key, data, **kwargs)
+
+    def get_dict(self, key: str) -> typing.Union[None, dict]:
+        return self._decode(key, '{}')
+
+    def set_list(self, key: str, data: list, **kwargs) -> bool:
+        return self._write(key, data, **kwargs)
+
+    def get_list(self, key: str) -> typing.Union[None, list]:
+        return self._decode(key, '[]')
+
+    def find_keys(self, pattern, count: int = None) -> typing.Iterator[bytes]:
+        yield from self.scan(pattern, count=count)
+
+    def scan(self, match_: str, count: int = None, **kwargs) -> typing.Iterator[bytes]:
+        """
+        iterates over the keys matching the glob pattern, keys are returned as bytes like on redis
+        :param match_:
+        :param count: ignored, kept for the interface compatibility
+        :param kwargs:
+        :return:
+        """
+        match_ = _key(match_)
+        now = time.monotonic()
+        with self._lock:
+            keys = [key for key, (expires_at, _) in self._data.items()
+                    if (expires_at is None or expires_at > now) and fnmatch.fnmatchcase(key, match_)]
+        for key in keys:
+            yield key.encode('utf-8')
+
+    def delete(self, *keys):
+        return self.delete_many(keys)
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict:
+        keys = list(keys)
+        return self._deserialize_many(keys, [self._read(key) for key in keys])
+
+    def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        for key, data in mapping.items():
+            self._write(key, data, ex=self._key_ttl(key, ex))
+        return True
+
+    def delete_many(self, keys: typing.Iterable[str]) -> int:
+        with self._lock:
+            return sum(self._remove(_key(key)) for key in keys)
+
+    def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        return self.delete_many(list(self.scan(pattern)))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'entries': len(self._data),
+                'bytes': self._size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+            }
+
+
+class AsyncMemoryBackend(AsyncBaseBackend):
+    """Implements asyncio Backend over the `MemoryBackend` store
+
+    Both backends must see the same data, sessions are written by the sync repositories
+    and read by the asyncio ones.
+    """
+
+    def __init__(self, backend: MemoryBackend):
+        super().__init__()
+        self.backend = backend
+        # Lock key to (token, monotonic expiry), the locks only span the process
+        self._locks: typing.Dict[str, typing.Tuple[str, float]] = {}
+
+    async def set_str(self, key, data, **kwargs) -> bool:
+        return self.backend.set_str(key, data, **kwargs)
+
+    async def get_str(self, key, **kwargs) -> str:
+        return self.backend.get_str(key, **kwargs)
+
+    async def set_dict(self, key, data, **kwargs) -> bool:
+        return self.backend.set_dict(key, data, **kwargs)
+
+    async def get_dict(self, key: str) -> typing.Union[None, dict]:
+        return self.backend.get_dict(key)
+
+    async def set_list(self, key: str, data: list, **kwargs) -> bool:
+        return self.backend.set_list(key, data, **kwargs)
+
+    async def get_list(self, key: str) -> typing.Union[None, list]:
+        return self.backend.get_list(key)
+
+    async def scan(self, match_: str, count: int = None, **kwargs) -> typing.AsyncIterator[bytes]:
+        for val in self.backend.scan(match_, count=count, **kwargs):
+            yield val
+
+    async def delete(self, *keys):
+        return self.backend.delete(*keys)
+
+    async def get_many(self, keys: typing.Iterable[str]) -> dict:
+        return self.backend.get_many(keys)
+
+    async def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        return self.backend.set_many(mapping, ex=ex)
+
+    async def delete_many(self, keys: typing.Iterable[str]) -> int:
+        return self.backend.delete_many(keys)
+
+    async def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        return self.backend.delete_matching(pattern, batch_size=batch_size)
+
+    async def acquire_lock(self, key: str, ttl: float) -> typing.Optional[str]:
+        now = time.monotonic()
+        held = self._locks.get(key)
+        if held and held[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._locks[key] = (token, now + ttl)
+        return token
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        held = self._locks.get(key)
+        if held and held[0] == token:
+            del self._locks[key]
+            return True
+        return False
@@ -1,37 +1,95 @@
 """Provides the backend storage for the application
 """
+import uuid
 import typing
-import json
 import redis
+import redis.asyncio
 import decimal
-from datetime import datetime, date
 
 from logging import getLogger
 
-from service_common.adapter.base import BaseBackend
+from service_common.adapter.base import BaseBackend, AsyncBaseBackend
+from service_common.adapter import serializers
+from service_common.adapter.serializers import BaseSerializer, DecimalJSONEncoder, get_serializer  # noqa: F401
 
 
 logger = getLogger(__name__)
 
+# Deletes the lock only if it is still held with the token
+RELEASE_LOCK_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
 
-class DecimalJSONEncoder(json.JSONEncoder):
 
-    def default(self, o):
-        if isinstance(o, decimal.Decimal):
-            # Serialize the Decimal
-            return f"{o:.10f}"
-        if isinstance(o, (datetime, date)):
-            return o.isoformat()
-        # Let the base class default method raise the TypeError
-        return super(DecimalJSONEncoder, self).default(o)
+class RedisSerializerMixin:
+    """Serialization and batching of the values stored on redis server
+    """
+    # Maximum number of keys sent in a single command of the pipeline
+    batch_size: int = 500
+    # Number of keys inspected by a single SCAN call
+    scan_count: int = 1000
 
+    # Serializer used for writing, values are always decoded by their format tag
+    serializer: BaseSerializer = get_serializer()
 
-class RedisBackend(BaseBackend):
+    def _serialize(self, data):
+        """
+
+        :param data:
+        :return:
+        """
+        if type(data) is str:
+            return data
+        return self.serializer.dumps(data)
+
+    @staticmethod
+    def _deserialize(data):
+        """
+
+        :param data:
+        :return:
+        """
+        return serializers.loads(data)
+
+    def _chunks(self, keys: list) -> typing.Iterator[list]:
+        for i in range(0, len(keys), self.batch_size):
+            yield keys[i:i + self.batch_size]
+
+    def _deserialize_many(self, keys: list, values: list) -> dict:
+        """
+        Maps the keys with decoded values, missing keys are skipped
+        :param keys:
+        :param values:
+        :return:
+        """
+        result = {}
+        for key, value in zip(keys, values):
+            if value is None:
+                continue
+            try:
+                result[key] = self._deserialize(value)
+            except ValueError:
+                # Plain strings saved with `set_str`
+                result[key] = value.decode('utf-8') if type(value) in [bytes, bytearray] else value
+        return result
+
+    @staticmethod
+    def _key_ttl(key: str, ex: typing.Union[int, typing.Dict[str, int], None]) -> typing.Optional[int]:
+        if isinstance(ex, dict):
+            return ex.get(key)
+        return ex
+
+
+class RedisBackend(RedisSerializerMixin, BaseBackend):
     """Implements Backend as redis serer
     """
 
-    def __init__(self, **con_settings):
+    def __init__(self, serializer: str = None, **con_settings):
         super().__init__()
+        self.serializer = get_serializer(serializer)
         try:
             self.conn = redis.StrictRedis(**con_settings)
         except redis.ConnectionError as ce:
@@ -79,8 +137,8 @@ class RedisBackend(BaseBackend):
             tmp = self.conn.get(key)
             try:
                 obj_tmp = self._deserialize(tmp or '{}')
-            except json.decoder.JSONDecodeError:
-                logger.fatal(f"Error in json decoding for {key} from cache: {str(d)}")
+            except ValueError as de:
+                logger.fatal(f"Error in decoding for {key} from cache: {str(de)}")
             except AttributeError as ae:
                 logger.fatal(f"For key {key} AttributeError: {str(ae)}")
             else:
@@ -117,8 +175,8 @@ class RedisBackend(BaseBackend):
             tmp = self.conn.get(key)
             try:
                 obj_tmp = self._deserialize(tmp or '[]')
-            except json.decoder.JSONDecodeError:
-                logger.fatal(f"Error in json decoding for {key} from cache: {str(d)}")
+            except ValueError as de:
+                logger.fatal(f"Error in decoding for {key} from cache: {str(de)}")
             except AttributeError as ae:
                 logger.fatal(f"For key {key} AttributeError: {str(ae)}")
             else:
@@ -128,49 +186,279 @@ class RedisBackend(BaseBackend):
         logger.debug(f"For key {key} value {tmp}")
         return tmp
 
-    @staticmethod
-    def _serialize(data):
+    def find_keys(self, pattern, count: int = None) -> typing.Iterator[bytes]:
         """
+        Streams the keys matching the pattern, uses cursor based SCAN
+        so the redis server is never blocked by a keyspace wide KEYS
 
-        :param data:
+        :param pattern:
+        :param count: number of keys inspected per round trip
         :return:
         """
-        if type(data) is str:
-            return data
-        return json.dumps(data, cls=DecimalJSONEncoder)
+        yield from self.scan(pattern, count=count)
 
-    @staticmethod
-    def _deserialize(data):
+    def scan(self, match_: str, count: int = None, **kwargs) -> typing.Iterator[bytes]:
         """
-
-        :param data:
+        iterates over the key pattern
+        :param match_:
+        :param count: number of keys inspected per round trip
+        :param kwargs:
         :return:
         """
-        if type(data) in [bytes, bytearray]:
-            data = data.decode('utf-8')  # Decode from Binary to utf-8
-        return json.loads(data, parse_float=decimal.Decimal)  # Decode json from string
+        for val in self.conn.scan_iter(match_, count=count or self.scan_count, **kwargs):
+            yield val
 
-    def find_keys(self, pattern):
+    def delete_matching(self, pattern: str, batch_size: int = None) -> int:
         """
+        Unlinks all the keys matching the pattern in batches,
+        memory of the removed values is reclaimed by redis in background.
+        The UNLINK of the batches are queued in a single pipeline sent after the scan
 
         :param pattern:
+        :param batch_size: number of keys scanned per round trip and unlinked per command
+        :return: int: number of removed keys
+        """
+        batch_size = batch_size or self.batch_size
+        pipe = self.conn.pipeline(transaction=False)
+        batch = []
+        for key in self.scan(pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                pipe.unlink(*batch)
+                batch = []
+        if batch:
+            pipe.unlink(*batch)
+        deleted = sum(pipe.execute()) if len(pipe) else 0
+        logger.info(f"Unlinked {deleted} keys matching {pattern!r}")
+        return deleted
+
+    def delete(self, *keys):
+        self.conn.delete(*keys)
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict:
+        """
+        Retrieves values of all the keys with MGET in a single round trip
+
+        :param keys: keys to retrieve
+        :return: dict: key to value mapping, missing keys are skipped
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for chunk in self._chunks(keys):
+                pipe.mget(chunk)
+            values = [value for chunk_values in pipe.execute() for value in chunk_values]
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while retrieving {len(keys)} keys from redis: {str(de)}")
+            return {}
+        return self._deserialize_many(keys, values)
+
+    def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        """
+        Saves all the values with a single pipeline
+
+        :param mapping: key to value mapping
+        :param ex: expiry in seconds for all keys, or a key to expiry mapping
         :return:
         """
-        for k in self.conn.keys(pattern):
-            yield k
+        if not mapping:
+            return True
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key, data in mapping.items():
+                pipe.set(key, self._serialize(data), ex=self._key_ttl(key, ex))
+            pipe.execute()
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while saving {len(mapping)} keys to redis: {str(de)}")
+            return False
+        return True
+
+    def delete_many(self, keys: typing.Iterable[str]) -> int:
+        """
+        Deletes all the keys with a single pipeline
 
-    def scan(self, match_: str, **kwargs) -> str:
+        :param keys:
+        :return: int: number of deleted keys
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        pipe = self.conn.pipeline(transaction=False)
+        for chunk in self._chunks(keys):
+            pipe.delete(*chunk)
+        return sum(pipe.execute())
+
+
+class AsyncRedisBackend(RedisSerializerMixin, AsyncBaseBackend):
+    """Implements asyncio Backend as redis server
+
+    All the coroutines share the single connection pool of the process
+    """
+
+    def __init__(self, serializer: str = None, **con_settings):
+        super().__init__()
+        self.serializer = get_serializer(serializer)
+        self.pool = redis.asyncio.ConnectionPool(**con_settings)
+        self.conn = redis.asyncio.StrictRedis(connection_pool=self.pool)
+
+    async def _set(self, key, data, **kwargs) -> bool:
+        try:
+            data = self._serialize(data)
+            await self.conn.set(key, data, **kwargs)
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while saving data for {key} to redis: {str(de)}")
+            return False
+        return True
+
+    async def _get_decoded(self, key, default: str):
+        tmp = None
+        try:
+            tmp = await self.conn.get(key)
+            try:
+                obj_tmp = self._deserialize(tmp or default)
+            except ValueError as de:
+                logger.fatal(f"Error in decoding for {key} from cache: {str(de)}")
+            else:
+                tmp = obj_tmp
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while retrieving data for {key} to redis: {str(de)}")
+        logger.debug(f"For key {key} value {tmp}")
+        return tmp
+
+    async def set_str(self, key, data, **kwargs) -> bool:
+        return await self._set(key, data, **kwargs)
+
+    async def get_str(self, key, **kwargs) -> str:
+        tmp = None
+        try:
+            tmp = await self.conn.get(key)
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while retrieving data for {key} to redis: {str(de)}")
+        logger.debug(f"For key {key} value {tmp}")
+        return tmp.decode('utf-8') if tmp else ''
+
+    async def set_dict(self, key, data, **kwargs) -> bool:
+        """Sets the dictionary to the redis server
+        :param: key: unique string to identify dictionary :type: str
+        :param: data: dictionary object to store :type: dict
+        """
+        return await self._set(key, data, **kwargs)
+
+    async def get_dict(self, key: str) -> typing.Union[None, dict]:
+        """Retrieves dictionary with given key
+
+        :param: key: unique string to identify dictionary :class: str
+        """
+        return await self._get_decoded(key, '{}')
+
+    async def set_list(self, key: str, data: list, **kwargs) -> bool:
+        return await self._set(key, data, **kwargs)
+
+    async def get_list(self, key: str) -> typing.Union[None, list]:
+        return await self._get_decoded(key, '[]')
+
+    async def scan(self, match_: str, count: int = None, **kwargs) -> typing.AsyncIterator[bytes]:
         """
         iterates over the key pattern
         :param match_:
+        :param count: number of keys inspected per round trip
         :param kwargs:
         :return:
         """
-        for val in self.conn.scan_iter(match_, **kwargs):
+        async for val in self.conn.scan_iter(match_, count=count or self.scan_count, **kwargs):
             yield val
 
-    def delete(self, *keys):
-        self.conn.delete(*keys)
+    async def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        batch_size = batch_size or self.batch_size
+        pipe = self.conn.pipeline(transaction=False)
+        batch = []
+        async for key in self.scan(pattern, count=batch_size):
+            batch.append(key)
+            if len(batch) >= batch_size:
+                pipe.unlink(*batch)
+                batch = []
+        if batch:
+            pipe.unlink(*batch)
+        deleted = sum(await pipe.execute()) if len(pipe) else 0
+        logger.info(f"Unlinked {deleted} keys matching {pattern!r}")
+        return deleted
+
+    async def delete(self, *keys):
+        await self.conn.delete(*keys)
+
+    async def get_many(self, keys: typing.Iterable[str]) -> dict:
+        """
+        Retrieves values of all the keys with MGET in a single round trip
+
+        :param keys: keys to retrieve
+        :return: dict: key to value mapping, missing keys are skipped
+        """
+        keys = list(keys)
+        if not keys:
+            return {}
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for chunk in self._chunks(keys):
+                pipe.mget(chunk)
+            values = [value for chunk_values in await pipe.execute() for value in chunk_values]
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while retrieving {len(keys)} keys from redis: {str(de)}")
+            return {}
+        return self._deserialize_many(keys, values)
+
+    async def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        """
+        Saves all the values with a single pipeline
+
+        :param mapping: key to value mapping
+        :param ex: expiry in seconds for all keys, or a key to expiry mapping
+        :return:
+        """
+        if not mapping:
+            return True
+        try:
+            pipe = self.conn.pipeline(transaction=False)
+            for key, data in mapping.items():
+                pipe.set(key, self._serialize(data), ex=self._key_ttl(key, ex))
+            await pipe.execute()
+        except redis.exceptions.DataError as de:
+            logger.fatal(f"Error while saving {len(mapping)} keys to redis: {str(de)}")
+            return False
+        return True
+
+    async def delete_many(self, keys: typing.Iterable[str]) -> int:
+        """
+        Deletes all the keys with a single pipeline
+
+        :param keys:
+        :return: int: number of deleted keys
+        """
+        keys = list(keys)
+        if not keys:
+            return 0
+        pipe = self.conn.pipeline(transaction=False)
+        for chunk in self._chunks(keys):
+            pipe.delete(*chunk)
+        return sum(await pipe.execute())
+
+    async def acquire_lock(self, key: str, ttl: float) -> typing.Optional[str]:
+        token = uuid.uuid4().hex
+        if await self.conn.set(key, token, nx=True, px=int(ttl * 1000)):
+            return token
+        return None
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        return bool(await self.conn.eval(RELEASE_LOCK_SCRIPT, 1, key, token))
+
+    async def close(self):
+        """
+        Releases the connections of the pool
+        :return:
+        """
+        await self.conn.close()
+        await self.pool.disconnect()
 
 
 if __name__ == "__main__":
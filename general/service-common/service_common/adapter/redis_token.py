@@ -2,8 +2,24 @@ import typing
 
 import inject
 
-from service_common.repository import RedisRepository
+from service_common.repository import RedisRepository, AsyncRedisRepository
 from service_common.settings import CoreSettings
+from service_common.adapter.local_cache import LocalTTLCache
+
+
+class TokenCache(LocalTTLCache):
+    """
+    Per worker cache of the active token sessions keyed by user `public_id`
+    Disabled by default, enable with `TOKEN_CACHE_ENABLED`
+
+    Logout invalidates the entry of the current worker only,
+    other workers may keep accepting the token up to `token_cache_ttl` seconds
+    """
+
+    @inject.autoparams('settings')
+    def __init__(self, settings: CoreSettings):
+        self.enabled = settings.token_cache_enabled
+        super(TokenCache, self).__init__(max_size=settings.token_cache_max_size, ttl=settings.token_cache_ttl)
 
 
 class TokenRedisRepository(RedisRepository):
@@ -21,3 +37,53 @@ class TokenRedisRepository(RedisRepository):
 
     def delete(self, uuid):
         self.backend.delete(uuid)
+        # Logged out session must not be served from the local cache
+        inject.instance(TokenCache).delete(uuid)
+
+    def add_tokens(self, tokens: typing.Dict[str, dict]):
+        self.add_many(tokens, ex=self.token_time_exp)
+
+    def get_tokens(self, uuids: typing.Iterable[str]) -> typing.Dict[str, dict]:
+        return self.get_many(uuids)
+
+    def delete_tokens(self, uuids: typing.Iterable[str]) -> int:
+        """
+        Revokes the sessions of all the given users in a single round trip
+        :param uuids:
+        :return:
+        """
+        uuids = list(uuids)
+        deleted = self.delete_many(uuids)
+        inject.instance(TokenCache).delete(*uuids)
+        return deleted
+
+
+class AsyncTokenRedisRepository(AsyncRedisRepository):
+
+    def __init__(self, *args, **kwargs):
+        settings = inject.instance(CoreSettings)
+        self.token_time_exp = settings.access_token_expire_minutes * 60
+        super(AsyncTokenRedisRepository, self).__init__(*args, **kwargs)
+
+    async def add_token(self, uuid, token_data):
+        await self._add(uuid, token_data, ex=self.token_time_exp)
+
+    async def get_token(self, uuid) -> typing.Optional[dict]:
+        return await self.backend.get_dict(uuid)
+
+    async def delete(self, uuid):
+        await self.backend.delete(uuid)
+        # Logged out session must not be served from the local cache
+        inject.instance(TokenCache).delete(uuid)
+
+    async def add_tokens(self, tokens: typing.Dict[str, dict]):
+        await self.add_many(tokens, ex=self.token_time_exp)
+
+    async def get_tokens(self, uuids: typing.Iterable[str]) -> typing.Dict[str, dict]:
+        return await self.get_many(uuids)
+
+    async def delete_tokens(self, uuids: typing.Iterable[str]) -> int:
+        uuids = list(uuids)
+        deleted = await self.delete_many(uuids)
+        inject.instance(TokenCache).delete(*uuids)
+        return deleted
@@ -0,0 +1,162 @@
+"""Provides the serializers of the values stored on the backends
+
+Serialized values are prefixed with a single byte tag identifying the format,
+untagged values are the legacy JSON documents and are still readable.
+"""
+import json
+import typing
+import decimal
+from datetime import datetime, date
+
+from logging import getLogger
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+logger = getLogger(__name__)
+
+TAG_JSON = b'\x01'
+TAG_MSGPACK = b'\x02'
+
+
+class SerializerError(ValueError):
+    """Raised when the value cannot be decoded
+    """
+
+
+class DecimalJSONEncoder(json.JSONEncoder):
+
+    def default(self, o):
+        if isinstance(o, decimal.Decimal):
+            # Serialize the Decimal
+            return f"{o:.10f}"
+        if isinstance(o, (datetime, date)):
+            return o.isoformat()
+        # Let the base class default method raise the TypeError
+        return super(DecimalJSONEncoder, self).default(o)
+
+
+def _default(o):
+    """
+    Encodes the types unknown to orjson/msgpack the same way as `DecimalJSONEncoder`
+    :param o:
+    :return:
+    """
+    if isinstance(o, decimal.Decimal):
+        return f"{o:.10f}"
+    if isinstance(o, (datetime, date)):
+        return o.isoformat()
+    raise TypeError(f"Object of type {type(o).__name__} is not serializable")
+
+
+class BaseSerializer:
+    name: str = None
+    tag: bytes = b''
+
+    def dumps(self, data) -> typing.Union[str, bytes]:
+        raise NotImplementedError
+
+    def loads(self, data: bytes):
+        raise NotImplementedError
+
+
+class JsonSerializer(BaseSerializer):
+    """Legacy untagged JSON, floats are decoded as `decimal.Decimal`
+    """
+    name = 'json'
+
+    def dumps(self, data) -> str:
+        return json.dumps(data, cls=DecimalJSONEncoder)
+
+    def loads(self, data: typing.Union[str, bytes]):
+        if type(data) in [bytes, bytearray]:
+            data = data.decode('utf-8')  # Decode from Binary to utf-8
+        return json.loads(data, parse_float=decimal.Decimal)  # Decode json from string
+
+
+class OrjsonSerializer(BaseSerializer):
+    """Tagged JSON encoded with orjson, floats are decoded as `float`
+    """
+    name = 'orjson'
+    tag = TAG_JSON
+
+    def __init__(self):
+        if orjson is None:
+            raise ImportError("orjson is required for the 'orjson' serializer")
+
+    def dumps(self, data) -> bytes:
+        return self.tag + orjson.dumps(data, default=_default)
+
+    def loads(self, data: bytes):
+        return orjson.loads(data)
+
+
+class MsgpackSerializer(BaseSerializer):
+    """Tagged msgpack
+    """
+    name = 'msgpack'
+    tag = TAG_MSGPACK
+
+    def __init__(self):
+        if msgpack is None:
+            raise ImportError("msgpack is required for the 'msgpack' serializer")
+
+    def dumps(self, data) -> bytes:
+        return self.tag + msgpack.packb(data, default=_default, use_bin_type=True)
+
+    def loads(self, data: bytes):
+        try:
+            return msgpack.unpackb(data, raw=False)
+        except (msgpack.UnpackException, ValueError) as e:
+            raise SerializerError(str(e)) from e
+
+
+SERIALIZERS: typing.Dict[str, typing.Type[BaseSerializer]] = {
+    JsonSerializer.name: JsonSerializer,
+    OrjsonSerializer.name: OrjsonSerializer,
+    MsgpackSerializer.name: MsgpackSerializer,
+}
+
+_legacy = JsonSerializer()
+
+
+def get_serializer(name: str = None) -> BaseSerializer:
+    """
+    Returns the serializer registered with given name, legacy JSON by default
+    :param name:
+    :return:
+    """
+    if not name:
+        return _legacy
+    try:
+        return SERIALIZERS[name]()
+    except KeyError:
+        raise ValueError(f"Unknown serializer {name!r}, expected one of {list(SERIALIZERS)}")
+
+
+def loads(data: typing.Union[str, bytes]):
+    """
+    Decodes the value with the serializer identified by its tag,
+    untagged values are decoded as legacy JSON
+
+    :param data:
+    :return:
+    """
+    if type(data) in [bytes, bytearray] and data:
+        tag, payload = data[:1], data[1:]
+        if tag == TAG_JSON:
+            # orjson.JSONDecodeError is a json.JSONDecodeError as well
+            return orjson.loads(payload) if orjson else json.loads(payload)
+        if tag == TAG_MSGPACK:
+            if msgpack is None:
+                raise SerializerError("msgpack is required to decode the value")
+            return MsgpackSerializer().loads(payload)
+    return _legacy.loads(data)
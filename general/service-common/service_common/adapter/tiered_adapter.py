@@ -0,0 +1,299 @@
+"""Provides the two tier backend, in-process cache (L1) in front of redis (L2)
+
+Writes and deletes are broadcast over redis pub/sub so that every worker
+evicts its local copy. A read racing with a write may still store the old
+value locally, such entries are stale at most for the local ttl.
+"""
+import copy
+import json
+import time
+import typing
+from uuid import uuid4
+
+from logging import getLogger
+
+import redis
+
+from service_common.adapter.base import BaseBackend, AsyncBaseBackend
+from service_common.adapter.local_cache import LocalTTLCache
+from service_common.adapter.redis_adapter import RedisBackend, AsyncRedisBackend
+
+
+logger = getLogger(__name__)
+
+INVALIDATION_CHANNEL = 'backend:invalidate'
+
+
+def _key(key) -> str:
+    return key.decode('utf-8') if type(key) in [bytes, bytearray] else key
+
+
+class CacheInvalidationListener:
+    """
+    Subscribes to the invalidation channel and evicts the keys changed by other workers
+    """
+
+    def __init__(self, conn: redis.StrictRedis, local: LocalTTLCache, channel: str = INVALIDATION_CHANNEL):
+        self.node_id = uuid4().hex
+        self.local = local
+        self.channel = channel
+        self._thread = None
+        try:
+            pubsub = conn.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{channel: self._on_message})
+            self._thread = pubsub.run_in_thread(sleep_time=1, daemon=True, exception_handler=self._on_error)
+        except redis.exceptions.RedisError as e:
+            logger.fatal(f"Unable to subscribe to {channel!r}, local cache relies on ttl only: {e}")
+
+    def message(self, keys: typing.Iterable = None) -> str:
+        """
+        Builds the invalidation message, without keys the whole local cache is cleared
+        :param keys:
+        :return:
+        """
+        return json.dumps({'node': self.node_id, 'keys': None if keys is None else [_key(k) for k in keys]})
+
+    def _on_message(self, message: dict):
+        try:
+            data = json.loads(message['data'])
+        except (ValueError, TypeError, KeyError) as e:
+            logger.error(f"Invalid cache invalidation message {message!r}: {e}")
+            return
+        if data.get('node') == self.node_id:
+            # Own writes are already evicted
+            return
+        keys = data.get('keys')
+        if keys is None:
+            self.local.clear()
+        else:
+            self.local.delete(*keys)
+
+    def _on_error(self, ex: BaseException, pubsub, thread):
+        logger.error(f"Cache invalidation subscription failed: {ex}")
+        # Invalidations may have been missed while disconnected
+        self.local.clear()
+        time.sleep(1)
+
+    def stop(self):
+        if self._thread:
+            self._thread.stop()
+
+
+class TieredCacheMixin:
+    """Local cache handling shared by the sync and asyncio tiered backends
+    """
+    local: LocalTTLCache = None
+    listener: CacheInvalidationListener = None
+
+    def _local_get(self, key):
+        value = self.local.get(_key(key))
+        # Callers may modify the value, never hand out the cached object
+        return copy.deepcopy(value) if value is not None else None
+
+    def _local_set(self, key, value):
+        # Missing keys are not cached, a new session must be visible right away
+        if value:
+            self.local.set(_key(key), copy.deepcopy(value))
+
+    def _evict(self, keys: typing.Iterable = None) -> str:
+        """
+        Evicts the keys from the local cache
+        :param keys: None clears the whole cache
+        :return: str: message to broadcast to the other workers
+        """
+        if keys is None:
+            self.local.clear()
+        else:
+            keys = list(keys)
+            self.local.delete(*[_key(k) for k in keys])
+        return self.listener.message(keys)
+
+
+class TieredBackend(TieredCacheMixin, BaseBackend):
+    """Implements Backend as in-process cache in front of redis server
+    """
+
+    def __init__(self, backend: RedisBackend, max_size: int = 10000, ttl: float = 5,
+                 channel: str = INVALIDATION_CHANNEL):
+        super().__init__()
+        self.backend = backend
+        self.local = LocalTTLCache(max_size=max_size, ttl=ttl)
+        self.listener = CacheInvalidationListener(backend.conn, self.local, channel=channel)
+
+    def _publish(self, keys: typing.Iterable = None):
+        message = self._evict(keys)
+        try:
+            self.backend.conn.publish(self.listener.channel, message)
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Unable to broadcast cache invalidation: {e}")
+
+    def _get(self, key, getter: typing.Callable):
+        value = self._local_get(key)
+        if value is None:
+            value = getter(key)
+            self._local_set(key, value)
+        return value
+
+    def set_str(self, key, data, **kwargs) -> bool:
+        result = self.backend.set_str(key, data, **kwargs)
+        self._publish([key])
+        return result
+
+    def get_str(self, key, **kwargs) -> str:
+        return self._get(key, self.backend.get_str)
+
+    def set_dict(self, key, data, **kwargs) -> bool:
+        result = self.backend.set_dict(key, data, **kwargs)
+        self._publish([key])
+        return result
+
+    def get_dict(self, key: str) -> typing.Union[None, dict]:
+        return self._get(key, self.backend.get_dict)
+
+    def set_list(self, key: str, data: list, **kwargs) -> bool:
+        result = self.backend.set_list(key, data, **kwargs)
+        self._publish([key])
+        return result
+
+    def get_list(self, key: str) -> typing.Union[None, list]:
+        return self._get(key, self.backend.get_list)
+
+    def find_keys(self, pattern, count: int = None):
+        return self.backend.find_keys(pattern, count=count)
+
+    def scan(self, match_: str, count: int = None, **kwargs):
+        return self.backend.scan(match_, count=count, **kwargs)
+
+    def delete(self, *keys):
+        self.backend.delete(*keys)
+        self._publish(keys)
+
+    def get_many(self, keys: typing.Iterable[str]) -> dict:
+        result = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                result[key] = value
+        if missing:
+            fetched = self.backend.get_many(missing)
+            for key, value in fetched.items():
+                self._local_set(key, value)
+            result.update(fetched)
+        return result
+
+    def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        result = self.backend.set_many(mapping, ex=ex)
+        self._publish(mapping.keys())
+        return result
+
+    def delete_many(self, keys: typing.Iterable[str]) -> int:
+        keys = list(keys)
+        deleted = self.backend.delete_many(keys)
+        self._publish(keys)
+        return deleted
+
+    def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        deleted = self.backend.delete_matching(pattern, batch_size=batch_size)
+        self._publish()
+        return deleted
+
+
+class AsyncTieredBackend(TieredCacheMixin, AsyncBaseBackend):
+    """Implements asyncio Backend as in-process cache in front of redis server
+
+    Shares the local cache and the invalidation listener of the sync `TieredBackend`
+    """
+
+    def __init__(self, backend: AsyncRedisBackend, tiered: TieredBackend):
+        super().__init__()
+        self.backend = backend
+        self.local = tiered.local
+        self.listener = tiered.listener
+
+    async def _publish(self, keys: typing.Iterable = None):
+        message = self._evict(keys)
+        try:
+            await self.backend.conn.publish(self.listener.channel, message)
+        except redis.exceptions.RedisError as e:
+            logger.error(f"Unable to broadcast cache invalidation: {e}")
+
+    async def _get(self, key, getter: typing.Callable):
+        value = self._local_get(key)
+        if value is None:
+            value = await getter(key)
+            self._local_set(key, value)
+        return value
+
+    async def set_str(self, key, data, **kwargs) -> bool:
+        result = await self.backend.set_str(key, data, **kwargs)
+        await self._publish([key])
+        return result
+
+    async def get_str(self, key, **kwargs) -> str:
+        return await self._get(key, self.backend.get_str)
+
+    async def set_dict(self, key, data, **kwargs) -> bool:
+        result = await self.backend.set_dict(key, data, **kwargs)
+        await self._publish([key])
+        return result
+
+    async def get_dict(self, key: str) -> typing.Union[None, dict]:
+        return await self._get(key, self.backend.get_dict)
+
+    async def set_list(self, key: str, data: list, **kwargs) -> bool:
+        result = await self.backend.set_list(key, data, **kwargs)
+        await self._publish([key])
+        return result
+
+    async def get_list(self, key: str) -> typing.Union[None, list]:
+        return await self._get(key, self.backend.get_list)
+
+    async def scan(self, match_: str, count: int = None, **kwargs) -> typing.AsyncIterator[bytes]:
+        async for val in self.backend.scan(match_, count=count, **kwargs):
+            yield val
+
+    async def delete(self, *keys):
+        await self.backend.delete(*keys)
+        await self._publish(keys)
+
+    async def get_many(self, keys: typing.Iterable[str]) -> dict:
+        result = {}
+        missing = []
+        for key in keys:
+            value = self._local_get(key)
+            if value is None:
+                missing.append(key)
+            else:
+                result[key] = value
+        if missing:
+            fetched = await self.backend.get_many(missing)
+            for key, value in fetched.items():
+                self._local_set(key, value)
+            result.update(fetched)
+        return result
+
+    async def set_many(self, mapping: dict, ex: typing.Union[int, typing.Dict[str, int]] = None) -> bool:
+        result = await self.backend.set_many(mapping, ex=ex)
+        await self._publish(mapping.keys())
+        return result
+
+    async def delete_many(self, keys: typing.Iterable[str]) -> int:
+        keys = list(keys)
+        deleted = await self.backend.delete_many(keys)
+        await self._publish(keys)
+        return deleted
+
+    async def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        deleted = await self.backend.delete_matching(pattern, batch_size=batch_size)
+        await self._publish()
+        return deleted
+
+    async def acquire_lock(self, key: str, ttl: float) -> typing.Optional[str]:
+        # Locks are never cached locally
+        return await self.backend.acquire_lock(key, ttl)
+
+    async def release_lock(self, key: str, token: str) -> bool:
+        return await self.backend.release_lock(key, token)
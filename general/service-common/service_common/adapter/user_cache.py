@@ -0,0 +1,100 @@
+"""Provides the cache of the current user loaded by the units of work
+
+The user is kept for the request in a context variable, so the row is loaded
+at most once per request. With `current_user_cache_ttl` set the user is also
+shared between the workers through the backend for `current_user_cache_ttl` seconds.
+"""
+import json
+import typing
+
+import inject
+
+from service_common.domains import User
+from service_common.settings import CoreSettings
+from service_common.repository import RedisRepository, AsyncRedisRepository
+from service_common.context_vars import get_current_user, set_current_user
+
+
+CURRENT_USER_KEY_PREFIX = 'current_user'
+
+
+def current_user_key(public_id: str) -> str:
+    return f'{CURRENT_USER_KEY_PREFIX}:{public_id}'
+
+
+def _request_user(public_id: str) -> typing.Optional[User]:
+    user = get_current_user()
+    if user is not None and user.public_id == public_id:
+        return user
+    return None
+
+
+def _forget_request_user(public_id: str):
+    if _request_user(public_id) is not None:
+        set_current_user(None)
+
+
+class CurrentUserCache(RedisRepository):
+    """
+    Request scoped cache of the current user, backed by the object store when `current_user_cache_ttl` is set
+    """
+
+    @inject.autoparams('settings')
+    def __init__(self, settings: CoreSettings, *args, **kwargs):
+        self.ttl = settings.current_user_cache_ttl
+        super(CurrentUserCache, self).__init__(*args, **kwargs)
+
+    def get(self, public_id: str) -> typing.Optional[User]:
+        user = _request_user(public_id)
+        if user is None and self.ttl:
+            data = self.backend.get_dict(current_user_key(public_id))
+            if data:
+                user = User(**data)
+                set_current_user(user)
+        return user
+
+    def set(self, user: User):
+        set_current_user(user)
+        if self.ttl:
+            self._add(current_user_key(user.public_id), json.loads(user.json()), ex=self.ttl)
+
+    def delete(self, public_id: str):
+        """
+        Invalidates the user, to call whenever the user record changes.
+        The backend is only called with the shared tier enabled
+        :param public_id:
+        :return:
+        """
+        _forget_request_user(public_id)
+        if self.ttl:
+            self.backend.delete(current_user_key(public_id))
+
+
+class AsyncCurrentUserCache(AsyncRedisRepository):
+    """
+    asyncio variant of `CurrentUserCache`, both share the request scoped user
+    """
+
+    @inject.autoparams('settings')
+    def __init__(self, settings: CoreSettings, *args, **kwargs):
+        self.ttl = settings.current_user_cache_ttl
+        super(AsyncCurrentUserCache, self).__init__(*args, **kwargs)
+
+    async def get(self, public_id: str) -> typing.Optional[User]:
+        user = _request_user(public_id)
+        if user is None and self.ttl:
+            data = await self.backend.get_dict(current_user_key(public_id))
+            if data:
+                user = User(**data)
+                set_current_user(user)
+        return user
+
+    async def set(self, user: User):
+        set_current_user(user)
+        if self.ttl:
+            await self._add(current_user_key(user.public_id), json.loads(user.json()), ex=self.ttl)
+
+    async def delete(self, public_id: str):
+        _forget_request_user(public_id)
+        if self.ttl:
+            await self.backend.delete(current_user_key(public_id))
@@ -16,6 +16,7 @@ from service_common.schema import ApiInfoSchema
 from service_common.utils import respond
 from service_common.error import BaseError, InternalServerError
 from service_common.logger import setup_logging
+from service_common.metrics import collect_metrics
 
 
 def create_app(settings) -> FastAPI:
@@ -85,6 +86,10 @@ def create_app(settings) -> FastAPI:
     async def healthz():
         return f'{settings.api_version}: {settings.app_title}'
 
+    @router.get('/metrics', include_in_schema=False)
+    async def metrics():
+        return collect_metrics()
+
     # Adding all routes to the api
     for r in APIRouter.get_routes():
         api.include_router(r)
@@ -18,3 +18,16 @@ def set_current_user_uuid(user_uuid: typing.Union[str, None]):
 def reset_current_user_uuid(_token):
     if _token:
         _current_user_uuid_ctx_var.reset(_token)
+
+
+CURRENT_USER_CTX_KEY = 'current_user'
+# Current user domain loaded in the request, see `service_common.adapter.user_cache`
+_current_user_ctx_var: ContextVar[typing.Any] = ContextVar(CURRENT_USER_CTX_KEY, default=None)
+
+
+def get_current_user():
+    return _current_user_ctx_var.get()
+
+
+def set_current_user(user: typing.Any):
+    return _current_user_ctx_var.set(user)
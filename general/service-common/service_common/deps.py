@@ -4,7 +4,8 @@ from fastapi import Depends
 from service_common import constants
 from service_common.schema import AuthenticationSchema
 from service_common.utils import extract_authenticated_user
-from service_common.repository import RedisRepository
+from service_common.repository import AsyncRedisRepository
+from service_common.adapter.redis_token import TokenCache
 from service_common.error import ApplicationError
 
 
@@ -16,8 +17,14 @@ async def get_authorised_user(token: str = Depends(AuthenticationSchema())):
     """
 
     public_id = extract_authenticated_user(token)
-    repo = RedisRepository()
-    token_data = repo.get(public_id)
+    cache = inject.instance(TokenCache)
+    if cache.enabled and cache.get(public_id):
+        # Session was validated recently by this worker
+        return public_id
+    repo = AsyncRedisRepository()
+    token_data = await repo.get(public_id)
     if token_data:
+        if cache.enabled:
+            cache.set(public_id, token_data)
         return public_id
     raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User already logout.")
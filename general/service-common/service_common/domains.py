@@ -3,7 +3,7 @@ from logging import getLogger
 from pydantic import BaseModel, Field
 
 from service_common import enums
-from service_common.utils import get_password_hash, verify_password
+from service_common.utils import get_password_hash, verify_password, get_password_hash_async
 
 T = typing.TypeVar('T')
 logger = getLogger(__name__)
@@ -168,6 +168,9 @@ class UserDb(User):
     def set_pass_hash(self, password):
         self.password_hash = get_password_hash(password)
 
+    async def set_pass_hash_async(self, password):
+        self.password_hash = await get_password_hash_async(password)
+
     def verify_password(self, password):
         return verify_password(password, self.password_hash)
 
@@ -180,6 +183,8 @@ class PaginatedParameters(BaseModel):
     page_size: int = 100
     order_by: str = 'created_at'
     order: enums.OrderEnum = enums.OrderEnum.desc
+    cursor: typing.Optional[str] = None
+    total: enums.PaginationTotalEnum = enums.PaginationTotalEnum.count
 
 
 class SearchPaginatedParameters(PaginatedParameters):
@@ -0,0 +1,179 @@
+"""
+Creates the SQLAlchemy engines with the pool configured by `CoreSettings`
+
+Every engine of the worker (primary, read replicas, asyncio) holds up to
+`sqlalchemy_pool_size + sqlalchemy_max_overflow` connections, size them so that
+`workers * engines * (pool size + overflow)` stays below Postgres `max_connections`.
+With PgBouncer in transaction mode set `sqlalchemy_null_pool` and let PgBouncer pool.
+"""
+import time
+import typing
+import threading
+
+from sqlalchemy import event, exc
+from sqlalchemy import create_engine as sa_create_engine
+from sqlalchemy.engine import Engine, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine as sa_create_async_engine
+from sqlalchemy.pool import Pool, QueuePool, NullPool
+
+from service_common.settings import CoreSettings
+from service_common.metrics import register_metrics
+
+
+class PoolMetrics:
+    """
+    Counts the checkouts of the connection pool of an engine and the time spent waiting for a connection
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.pool: typing.Optional[Pool] = None
+        self._lock = threading.Lock()
+        self._connects = 0
+        self._checkouts = 0
+        self._in_use = 0
+        self._max_in_use = 0
+        self._invalidated = 0
+        self._timeouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        register_metrics(f'db_pool_{name}', self.metrics)
+
+    def pool_class(self, pool_class: typing.Type[Pool]) -> typing.Type[Pool]:
+        """
+        Subclass of `pool_class` timing the wait for a connection
+        :param pool_class:
+        :return:
+        """
+        metrics = self
+
+        class TimedPool(pool_class):
+            def _do_get(self):
+                started = time.monotonic()
+                try:
+                    return super()._do_get()
+                except exc.TimeoutError:
+                    metrics.timeout()
+                    raise
+                finally:
+                    metrics.waited(time.monotonic() - started)
+
+        TimedPool.__name__ = f'Timed{pool_class.__name__}'
+        return TimedPool
+
+    def instrument(self, engine: Engine):
+        """
+        Listens to the pool events of the engine
+        :param engine:
+        :return:
+        """
+        self.pool = engine.pool
+        event.listen(engine, 'connect', self.on_connect)
+        event.listen(engine, 'checkout', self.on_checkout)
+        event.listen(engine, 'checkin', self.on_checkin)
+        event.listen(engine, 'invalidate', self.on_invalidate)
+        # Pools recreated by `engine.dispose()` keep the listeners, follow the new pool
+        event.listen(engine, 'engine_disposed', lambda eng: setattr(self, 'pool', eng.pool))
+
+    def waited(self, elapsed: float):
+        with self._lock:
+            self._waits += 1
+            self._total_wait += elapsed
+            self._max_wait = max(self._max_wait, elapsed)
+
+    def timeout(self):
+        with self._lock:
+            self._timeouts += 1
+
+    def on_connect(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._connects += 1
+
+    def on_checkout(self, dbapi_connection, connection_record, connection_proxy):
+        with self._lock:
+            self._checkouts += 1
+            self._in_use += 1
+            self._max_in_use = max(self._max_in_use, self._in_use)
+
+    def on_checkin(self, dbapi_connection, connection_record):
+        with self._lock:
+            self._in_use = max(self._in_use - 1, 0)
+
+    def on_invalidate(self, dbapi_connection, connection_record, exception):
+        with self._lock:
+            self._invalidated += 1
+
+    def metrics(self) -> dict:
+        with self._lock:
+            values = {
+                'pool': type(self.pool).__name__ if self.pool is not None else None,
+                'connects': self._connects,
+                'checkouts': self._checkouts,
+                'in_use': self._in_use,
+                'max_in_use': self._max_in_use,
+                'invalidated': self._invalidated,
+                'timeouts': self._timeouts,
+                'avg_wait': self._total_wait / self._waits if self._waits else 0.0,
+                'max_wait': self._max_wait,
+            }
+        if isinstance(self.pool, QueuePool):
+            values.update(size=self.pool.size(), idle=self.pool.checkedin(), overflow=self.pool.overflow())
+        return values
+
+
+def engine_options(uri: str, settings: CoreSettings, metrics: PoolMetrics = None) -> dict:
+    """
+    Keyword arguments of `create_engine` configuring the pool of the database
+    :param uri: database url
+    :param settings:
+    :param metrics: times the connection checkouts when set
+    :return:
+    """
+    url = make_url(uri)
+    if settings.sqlalchemy_null_pool:
+        pool_class = NullPool
+    else:
+        # SQLite files use NullPool, in memory SQLite a single connection per thread
+        pool_class = url.get_dialect().get_pool_class(url)
+    options = {
+        'pool_pre_ping': settings.sqlalchemy_pool_pre_ping,
+        'pool_recycle': settings.sqlalchemy_pool_recycle,
+    }
+    if issubclass(pool_class, QueuePool):
+        options.update(
+            pool_size=settings.sqlalchemy_pool_size,
+            max_overflow=settings.sqlalchemy_max_overflow,
+            pool_timeout=settings.sqlalchemy_pool_timeout,
+            pool_use_lifo=settings.sqlalchemy_pool_use_lifo,
+        )
+    options['poolclass'] = metrics.pool_class(pool_class) if metrics else pool_class
+    return options
+
+
+def create_engine(uri: str, settings: CoreSettings, name: str = 'primary') -> Engine:
+    """
+    Creates the engine with the configured pool, its metrics are exposed as `db_pool_{name}`
+    :param uri: database url
+    :param settings:
+    :param name: name of the engine in the metrics
+    :return:
+    """
+    metrics = PoolMetrics(name)
+    engine = sa_create_engine(uri, **engine_options(uri, settings, metrics))
+    metrics.instrument(engine)
+    return engine
+
+
+def create_async_engine(uri: str, settings: CoreSettings, name: str = 'async') -> AsyncEngine:
+    """
+    asyncio variant of `create_engine`
+    :param uri: database url with an asyncio driver
+    :param settings:
+    :param name: name of the engine in the metrics
+    :return:
+    """
+    metrics = PoolMetrics(name)
+    engine = sa_create_async_engine(uri, **engine_options(uri, settings, metrics))
+    metrics.instrument(engine.sync_engine)
+    return engine
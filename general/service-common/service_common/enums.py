@@ -25,6 +25,18 @@ class OrderEnum(str, enum.Enum):
     asc: str = 'ASC'
 
 
+class PaginationTotalEnum(str, enum.Enum):
+    count: str = 'count'
+    window: str = 'window'
+    estimate: str = 'estimate'
+    none: str = 'none'
+
+
+class ExportFormatEnum(str, enum.Enum):
+    ndjson: str = 'NDJSON'
+    csv: str = 'CSV'
+
+
 class OrderByEnum(str, enum.Enum):
     recently_added: str = 'RECENTLY_ADDED'
     recently_updated: str = 'RECENTLY_UPDATED'
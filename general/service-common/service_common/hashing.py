@@ -0,0 +1,148 @@
+"""
+Runs the bcrypt password hashing on a worker pool
+
+Each bcrypt call keeps the CPU busy for 100ms+, running it on the event loop
+stalls every other request served by the worker.
+"""
+import time
+import asyncio
+import typing
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor
+from logging import getLogger
+
+import inject
+from passlib.context import CryptContext
+
+from service_common import constants
+from service_common.settings import CoreSettings
+from service_common.error import ApplicationError
+from service_common.metrics import register_metrics
+
+logger = getLogger(__name__)
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+EXECUTOR_THREAD = 'thread'
+EXECUTOR_PROCESS = 'process'
+EXECUTOR_INLINE = 'inline'
+
+
+def hash_password(password: str) -> str:
+    try:
+        return pwd_context.hash(password)
+    except Exception:
+        return password
+
+
+def check_password(plain_password: str, hashed_password: str) -> bool:
+    try:
+        return pwd_context.verify(plain_password, hashed_password)
+    except Exception as exp:
+        logger.error(f"Unable to verify password {exp}", exc_info=True)
+        return True
+
+
+class PasswordHasher:
+    """
+    Bounded executor for the password hashing
+
+    `password_hash_executor` selects `thread` | `process` | `inline` execution,
+    at most `password_hash_workers + password_hash_queue_size` calls are accepted at once,
+    calls above the limit are rejected with HTTP 429.
+    """
+
+    @inject.autoparams('settings')
+    def __init__(self, settings: CoreSettings):
+        self.mode = settings.password_hash_executor
+        self.max_workers = settings.password_hash_workers
+        self.max_pending = settings.password_hash_workers + settings.password_hash_queue_size
+        self._executor: typing.Optional[Executor] = self._create_executor()
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._lock = threading.Lock()
+        self._submitted = 0
+        self._completed = 0
+        self._rejected = 0
+        self._pending = 0
+        self._total_time = 0.0
+        self._max_time = 0.0
+        register_metrics('password_hasher', self.metrics)
+
+    def _create_executor(self) -> typing.Optional[Executor]:
+        if self.mode == EXECUTOR_PROCESS:
+            return ProcessPoolExecutor(max_workers=self.max_workers)
+        if self.mode == EXECUTOR_THREAD:
+            return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='password-hasher')
+        if self.mode != EXECUTOR_INLINE:
+            logger.warning(f"Unknown password hash executor {self.mode!r}, hashing inline")
+        return None
+
+    def _submit(self, fn: typing.Callable, *args) -> Future:
+        """
+        Submits the call to the pool, rejects it when the queue is full
+        :param fn:
+        :param args:
+        :return:
+        """
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise ApplicationError(response_code=constants.HTTP_429_TOO_MANY_REQUESTS,
+                                   message="Too many login requests. Please try again.")
+        started = time.monotonic()
+        with self._lock:
+            self._submitted += 1
+            self._pending += 1
+        try:
+            future = self._executor.submit(fn, *args)
+        except Exception:
+            self._finished(started)
+            raise
+        future.add_done_callback(lambda _: self._finished(started))
+        return future
+
+    def _finished(self, started: float):
+        elapsed = time.monotonic() - started
+        self._slots.release()
+        with self._lock:
+            self._pending -= 1
+            self._completed += 1
+            self._total_time += elapsed
+            self._max_time = max(self._max_time, elapsed)
+
+    def hash(self, password: str) -> str:
+        if self._executor is None:
+            return hash_password(password)
+        return self._submit(hash_password, password).result()
+
+    def verify(self, plain_password: str, hashed_password: str) -> bool:
+        if self._executor is None:
+            return check_password(plain_password, hashed_password)
+        return self._submit(check_password, plain_password, hashed_password).result()
+
+    async def hash_async(self, password: str) -> str:
+        if self._executor is None:
+            return hash_password(password)
+        return await asyncio.wrap_future(self._submit(hash_password, password))
+
+    async def verify_async(self, plain_password: str, hashed_password: str) -> bool:
+        if self._executor is None:
+            return check_password(plain_password, hashed_password)
+        return await asyncio.wrap_future(self._submit(check_password, plain_password, hashed_password))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                'executor': self.mode,
+                'workers': self.max_workers,
+                'max_pending': self.max_pending,
+                'pending': self._pending,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'rejected': self._rejected,
+                'avg_time': self._total_time / self._completed if self._completed else 0.0,
+                'max_time': self._max_time,
+            }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
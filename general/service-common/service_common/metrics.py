@@ -0,0 +1,25 @@
+"""
+Registry of the in-process metrics exposed on the `/metrics` route
+"""
+import typing
+
+
+_providers: typing.Dict[str, typing.Callable[[], dict]] = {}
+
+
+def register_metrics(name: str, provider: typing.Callable[[], dict]):
+    """
+    Registers the callable returning the current metrics of a component
+    :param name: str: Name of the component
+    :param provider: Callable: returns the dictionary of metrics
+    :return:
+    """
+    _providers[name] = provider
+
+
+def collect_metrics() -> dict:
+    """
+    Returns the metrics of all the registered components
+    :return:
+    """
+    return {name: provider() for name, provider in _providers.items()}
@@ -7,7 +7,7 @@ from sqlalchemy import func
 from sqlalchemy.ext.declarative import as_declarative, declared_attr
 from sqlalchemy.ext.hybrid import hybrid_property
 
-from service_common.utils import get_password_hash, verify_password
+from service_common.utils import get_password_hash, verify_password, get_password_hash_async, verify_password_async
 from service_common.datetime_util import utc_now, make_tzaware, get_local_utcoffset, localized_dt_string
 
 
@@ -56,6 +56,12 @@ class UserBaseModel(CoreModel):
     def check_password(self, password):
         return verify_password(password, self.password_hash)
 
+    async def set_password_async(self, password):
+        self.password_hash = await get_password_hash_async(password)
+
+    async def check_password_async(self, password):
+        return await verify_password_async(password, self.password_hash)
+
     @property
     def name(self):
         data = []
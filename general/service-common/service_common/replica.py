@@ -0,0 +1,133 @@
+"""Provides the routing of the read queries to the database read replicas
+
+Units of work read from the replicas until their first write, from then on
+every query goes to the primary so that the unit reads its own writes.
+Replicas lagging behind the primary are skipped, the primary serves the
+reads when no replica is available.
+"""
+import time
+import typing
+import itertools
+import threading
+
+from logging import getLogger
+
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.orm import Session
+
+from service_common.metrics import register_metrics
+
+
+logger = getLogger(__name__)
+
+# Replay lag of a Postgres standby, zero when all the received WAL is replayed
+POSTGRES_LAG_QUERY = text(
+    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+)
+
+
+class ReplicaRouter:
+    """
+    Picks the replica engine for the reads with round-robin, skipping the replicas lagging
+    more than `max_lag` seconds. The lag of a replica is measured at most every `check_interval` seconds.
+    """
+
+    def __init__(self, primary: Engine, replicas: typing.List[Engine], max_lag: float = 5,
+                 check_interval: float = 10):
+        self.primary = primary
+        self.replicas = replicas
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.primary_reads = 0
+        self._cycle = itertools.cycle(replicas)
+        self._lock = threading.Lock()
+        # Last measure of each replica: (monotonic time, lag in seconds or None if unreachable)
+        self._lag: typing.Dict[Engine, typing.Tuple[float, typing.Optional[float]]] = {}
+        self._reads: typing.Dict[Engine, int] = {replica: 0 for replica in replicas}
+        register_metrics('db_replicas', self.metrics)
+
+    def replica(self) -> Engine:
+        """
+        Returns the engine to read from, the primary when no replica is available
+        :return:
+        """
+        for _ in range(len(self.replicas)):
+            with self._lock:
+                engine = next(self._cycle)
+            if self.is_available(engine):
+                self._reads[engine] += 1
+                return engine
+        self.primary_reads += 1
+        return self.primary
+
+    def is_available(self, engine: Engine) -> bool:
+        checked_at, lag = self._lag.get(engine, (None, None))
+        now = time.monotonic()
+        if checked_at is None or now - checked_at > self.check_interval:
+            lag = self.measure_lag(engine)
+            self._lag[engine] = (now, lag)
+        return lag is not None and lag <= self.max_lag
+
+    @staticmethod
+    def measure_lag(engine: Engine) -> typing.Optional[float]:
+        """
+        Replication lag of the replica in seconds, `None` if it cannot be reached
+        :param engine:
+        :return:
+        """
+        try:
+            with engine.connect() as conn:
+                if engine.dialect.name == 'postgresql':
+                    return float(conn.execute(POSTGRES_LAG_QUERY).scalar() or 0)
+                conn.execute(text("SELECT 1"))
+                return 0.0
+        except SQLAlchemyError as e:
+            logger.error(f"Read replica {engine.url!r} is not available: {e}")
+            return None
+
+    def metrics(self) -> dict:
+        return {
+            'primary_reads': self.primary_reads,
+            'replicas': {
+                repr(engine.url): {
+                    'reads': self._reads[engine],
+                    'lag': self._lag.get(engine, (None, None))[1],
+                }
+                for engine in self.replicas
+            },
+        }
+
+
+class RoutingSession(Session):
+    """Session sending the reads to the read replicas and the writes to the primary
+
+    `info['read_only']`: `None` reads from the replicas until the first write,
+    `True` reads from the replicas and refuses the writes, `False` uses the primary only
+    """
+
+    def __init__(self, router: ReplicaRouter = None, **kwargs):
+        super().__init__(**kwargs)
+        self.router = router
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self.router is None:
+            return super().get_bind(mapper=mapper, clause=clause, **kwargs)
+        read_only = self.info.get('read_only')
+        writing = self._flushing or (
+            clause is not None
+            and (getattr(clause, 'is_dml', False) or getattr(clause, '_for_update_arg', None) is not None)
+        )
+        if writing:
+            if read_only:
+                raise RuntimeError("Cannot write in a read-only unit of work")
+            # Read your own writes, stay on the primary from now on
+            self.info['primary'] = True
+        if writing or read_only is False or self.info.get('primary'):
+            return self.router.primary
+        if self.info.get('replica') is None:
+            # One replica per session, the reads of the unit see the same snapshot
+            self.info['replica'] = self.router.replica()
+        return self.info['replica']
@@ -1,15 +1,29 @@
+import io
 import abc
+import enum
+import json
 import math
+import base64
 import typing
+import decimal
+import datetime
 from uuid import uuid4
 
 import inject
-from sqlalchemy import func, Column, or_, and_, distinct, update
+from pydantic import BaseModel
+from sqlalchemy import func, Column, or_, and_, distinct, update, insert, cast, literal, String, DateTime
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
 
 from sqlalchemy.orm import Session, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from service_common import constants
 from service_common.model import CoreModel
-from service_common.adapter.redis_adapter import BaseBackend
+from service_common.enums import PaginationTotalEnum
+from service_common.search import BaseSearchStrategy, LikeSearch, SEARCH_RANK
+from service_common.error import ApplicationError
+from service_common.adapter.redis_adapter import BaseBackend, AsyncBaseBackend
 from service_common.context_vars import get_current_user_uuid
 
 
@@ -31,10 +45,27 @@ class AbstractRepository(abc.ABC):
 class SqlAlchemyRepository(AbstractRepository):
     model: CoreModel = None
     search_fields: typing.List[Column] = None
-
-    def __init__(self, session: Session):
+    # Defaults to `LikeSearch` over the `search_fields`
+    search_strategy: BaseSearchStrategy = None
+    # Planner estimates below this row count are replaced with the exact count
+    estimate_threshold: int = 1000
+    # `add_many` loads at least this many rows with COPY on Postgres
+    copy_threshold: int = 10000
+    # Columns never overwritten by `upsert_many`
+    upsert_exclude: typing.Tuple[str] = ('id', 'public_id', 'created_at', 'created_by')
+    # Bound parameters allowed in one statement by the database driver
+    bind_param_limits: typing.Dict[str, int] = {'sqlite': 999, 'postgresql': 32767}
+    # Databases sorting the NULLs after the values in ascending order
+    nulls_sort_high: typing.Tuple[str] = ('postgresql', 'oracle')
+
+    def __init__(self, session: Session, identity_cache: dict = None):
+        """
+        :param session: sqlalchemy.orm.Session:
+        :param identity_cache: dict: records loaded by public id, shared by the repositories of the Unit of Work
+        """
         super().__init__()
         self.session = session
+        self.identity_cache = identity_cache if identity_cache is not None else {}
 
     def add(self, model: typing.Union[CoreModel, dict]):
         if isinstance(model, dict):
@@ -46,6 +77,155 @@ class SqlAlchemyRepository(AbstractRepository):
         self.session.add(model)
         return model
 
+    def _stamp_rows(self, rows: typing.Iterable[dict]) -> typing.List[dict]:
+        """
+        Sets `created_by`/`modified_by`/`public_id` of the new rows the way `add` does
+        :param rows:
+        :return:
+        """
+        user_uuid = get_current_user_uuid()
+        stamped = []
+        for row in rows:
+            row = dict(row)
+            row.setdefault('created_by', user_uuid)
+            row.setdefault('modified_by', row['created_by'])
+            if not row.get('public_id'):
+                row['public_id'] = str(uuid4())
+            stamped.append(row)
+        return stamped
+
+    @staticmethod
+    def _chunks(rows: typing.List[dict], chunk_size: int) -> typing.Iterator[typing.List[dict]]:
+        """
+        Splits the rows in chunks of rows having the same columns, executemany needs the same parameters
+        :param rows:
+        :param chunk_size:
+        :return:
+        """
+        for start in range(0, len(rows), chunk_size):
+            groups = {}
+            for row in rows[start:start + chunk_size]:
+                groups.setdefault(tuple(sorted(row)), []).append(row)
+            yield from groups.values()
+
+    def add_many(self, rows: typing.Iterable[dict], chunk_size: int = 1000) -> typing.List[str]:
+        """
+        Inserts the rows with executemany Core inserts, skips the ORM unit of work.
+        Loads of `copy_threshold` rows or more use COPY on Postgres.
+        :param rows: iterable of dict: column values
+        :param chunk_size: int: rows per statement
+        :return: list: public ids of the inserted rows
+        """
+        rows = self._stamp_rows(rows)
+        if not rows:
+            return []
+        if len(rows) >= self.copy_threshold and self.session.get_bind().dialect.name == 'postgresql':
+            self._copy_rows(rows)
+        else:
+            statement = insert(self.model.__table__)
+            for chunk in self._chunks(rows, chunk_size):
+                self.session.execute(statement, chunk)
+        return [row['public_id'] for row in rows]
+
+    def _copy_rows(self, rows: typing.List[dict]):
+        """
+        Loads the rows with `COPY ... FROM STDIN` in the session transaction
+        :param rows:
+        :return:
+        """
+        table = self.model.__table__
+        # Raw psycopg2 connection of the session transaction, on the primary database
+        connection = self.session.connection(bind_arguments={'clause': insert(table)})
+        columns, buffer = self._copy_buffer(rows, connection.dialect)
+        with connection.connection.cursor() as cursor:
+            cursor.copy_expert(
+                f"COPY {table.name} ({', '.join(columns)}) FROM STDIN", buffer
+            )
+
+    def _copy_buffer(self, rows: typing.List[dict], dialect) -> typing.Tuple[typing.List[str], io.StringIO]:
+        """
+        Builds the COPY text format input of the rows, the values are processed by the column types
+        the way the executemany inserts process them
+        :param rows:
+        :param dialect: sqlalchemy.engine.Dialect: of the connection
+        :return: tuple: column names and the input
+        """
+        table = self.model.__table__
+        names = set().union(*rows)
+        defaults = {}
+        for column in table.columns:
+            # COPY does not apply the python side defaults, server defaults still apply
+            if column.name not in names and column.default is not None and not column.primary_key:
+                names.add(column.name)
+                defaults[column.name] = column.default
+        columns = [column for column in table.columns if column.name in names]
+        processors = [column.type.bind_processor(dialect) for column in columns]
+
+        buffer = io.StringIO()
+        for row in rows:
+            values = []
+            for column, processor in zip(columns, processors):
+                if column.name in row:
+                    value = row[column.name]
+                else:
+                    default = defaults[column.name]
+                    value = default.arg(None) if default.is_callable else default.arg
+                values.append(self._copy_value(value, processor))
+            buffer.write('\t'.join(values) + '\n')
+        buffer.seek(0)
+        return [column.name for column in columns], buffer
+
+    @staticmethod
+    def _copy_value(value, processor: typing.Callable = None) -> str:
+        """
+        Formats the value for the COPY text format
+        :param value:
+        :param processor: bind processor of the column type, serializes the JSON values for instance
+        :return:
+        """
+        if processor is not None:
+            value = processor(value)
+        if isinstance(value, enum.Enum):
+            # Stored by value like the driver does for the string enums, not as `UserTypeEnum.farmer`
+            value = value.value
+        if value is None:
+            return '\\N'
+        return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+    def upsert_many(self, rows: typing.Iterable[dict], conflict_cols: typing.List[str],
+                    update_cols: typing.List[str] = None, chunk_size: int = 1000):
+        """
+        Inserts the rows or updates the existing records with `INSERT ... ON CONFLICT` (Postgres and SQLite)
+        :param rows: iterable of dict: column values
+        :param conflict_cols: list: columns of the unique index identifying the record
+        :param update_cols: list: columns updated on conflict, all the given columns except
+            `conflict_cols` and `upsert_exclude` by default
+        :param chunk_size: int: rows per statement
+        :return:
+        """
+        dialect = self.session.get_bind().dialect.name
+        if dialect == 'postgresql':
+            dialect_insert = postgresql_insert
+        elif dialect == 'sqlite':
+            dialect_insert = sqlite_insert
+        else:
+            raise NotImplementedError(f"upsert_many is not supported on {dialect}")
+
+        rows = self._stamp_rows(rows)
+        for chunk in self._chunks(rows, chunk_size):
+            statement = dialect_insert(self.model.__table__)
+            columns = update_cols or [name for name in chunk[0]
+                                      if name not in conflict_cols and name not in self.upsert_exclude]
+            if columns:
+                set_ = {name: statement.excluded[name] for name in columns}
+                if 'modified_at' in self.model.__table__.c:
+                    # `onupdate` is not applied to the conflict update
+                    set_.setdefault('modified_at', func.current_timestamp())
+                statement = statement.on_conflict_do_update(index_elements=conflict_cols, set_=set_)
+            else:
+                statement = statement.on_conflict_do_nothing(index_elements=conflict_cols)
+            self.session.execute(statement, chunk)
+
     def get(self, id_: int, is_deleted: bool = False) -> typing.Union[CoreModel, None]:
         """
         Returns the record matching with given id_
@@ -62,7 +242,39 @@ class SqlAlchemyRepository(AbstractRepository):
         :param is_deleted: bool:
         :return:
         """
-        return self.session.query(self.model).filter_by(public_id=public_id).first()
+        key = (self.model.__tablename__, public_id)
+        record = self.identity_cache.get(key)
+        if record is None:
+            record = self.session.query(self.model).filter_by(public_id=public_id).first()
+            if record is not None:
+                self.identity_cache[key] = record
+        return record
+
+    def find_by_public_ids(self, public_ids: typing.Iterable[str]) -> typing.Dict[str, CoreModel]:
+        """
+        Return the records for given Public IDs with one IN query per chunk of ids,
+        the records already loaded in the Unit of Work are not queried again
+        :param public_ids: iterable of str:
+        :return: dict: records by public id, missing ids are not in the dict
+        """
+        result = {}
+        missing = []
+        for public_id in dict.fromkeys(public_ids):
+            if not public_id:
+                continue
+            record = self.identity_cache.get((self.model.__tablename__, public_id))
+            if record is None:
+                missing.append(public_id)
+            else:
+                result[public_id] = record
+
+        chunk_size = self.bind_param_limits.get(self.session.get_bind().dialect.name, 1000)
+        for start in range(0, len(missing), chunk_size):
+            chunk = missing[start:start + chunk_size]
+            for record in self.session.query(self.model).filter(self.model.public_id.in_(chunk)):
+                self.identity_cache[(self.model.__tablename__, record.public_id)] = record
+                result[record.public_id] = record
+        return result
 
     def update(self, values: dict, where: tuple):
         """
@@ -114,6 +326,63 @@ class SqlAlchemyRepository(AbstractRepository):
         :param kwargs:
         :return:
         """
+        return self.get_filter_query(order_by=order_by, order=order, **kwargs).all()
+
+    def filter_iter(self, order_by: str = None, order: str = None, yield_per: int = 1000,
+                    columns: typing.List[Column] = None, **kwargs) -> typing.Iterator:
+        """
+        Same as `filter` but streams the records, see `stream`
+        :param order_by:
+        :param order:
+        :param yield_per: int: rows fetched at a time
+        :param columns: list: yield row tuples of these columns instead of the model objects
+        :param kwargs:
+        :return:
+        """
+        query = self.get_filter_query(order_by=order_by, order=order, **kwargs)
+        if columns:
+            query = query.with_entities(*columns)
+        return self.stream(query, yield_per=yield_per)
+
+    def search_iter(self, search: str = None, order_by: str = 'created_at', order: str = 'desc',
+                    columns: typing.List[Column] = None, yield_per: int = 1000, **kwargs) -> typing.Iterator:
+        """
+        Streams all the records of the listing, filtered and searched like `get_paginated_result`, see `stream`
+        :param search:
+        :param order_by:
+        :param order:
+        :param columns: list: yield row tuples of these columns instead of the model objects
+        :param yield_per: int: rows fetched at a time
+        :param kwargs:
+        :return:
+        """
+        query, _ = self.get_list_filter_query(search=search, order_by=order_by or 'id', order=order,
+                                              total=PaginationTotalEnum.none, **kwargs)
+        if columns:
+            query = query.with_entities(*columns)
+        return self.stream(query, yield_per=yield_per)
+
+    @staticmethod
+    def stream(query: Query, yield_per: int = 1000) -> typing.Iterator:
+        """
+        Iterates over the query results fetching `yield_per` rows at a time through a server side
+        cursor, the memory stays flat whatever the number of rows.
+        Commit only after the iteration, the commit closes the cursor.
+        :param query:
+        :param yield_per: int: rows fetched at a time
+        :return:
+        """
+        query = query.execution_options(stream_results=True, max_row_buffer=yield_per).yield_per(yield_per)
+        yield from query
+
+    def get_filter_query(self, order_by: str = None, order: str = None, **kwargs) -> Query:
+        """
+        Query of the records matching given keyword arguments
+        :param order_by:
+        :param order:
+        :param kwargs:
+        :return:
+        """
         if kwargs:
             kwargs['is_deleted'] = kwargs.get('is_deleted', False)
         else:
@@ -128,9 +397,9 @@ class SqlAlchemyRepository(AbstractRepository):
         if order_by:
             # Apply orderby clause
             order = order or 'desc'
-            return query.order_by(getattr(getattr(self.model, order_by), order.lower())()).all()
+            return query.order_by(getattr(getattr(self.model, order_by), order.lower())())
         else:
-            return query.all()
+            return query
 
     def refresh(self, instance_):
         """
@@ -157,41 +426,207 @@ class SqlAlchemyRepository(AbstractRepository):
         if not kwargs:
             raise Exception(f"Cannot delete all record from {self.model.__tablename__}")
         self.session.query(self.model).filter_by(**kwargs).delete()
+        # Deleted records must not be returned from the cache
+        for key in [key for key in self.identity_cache if key[0] == self.model.__tablename__]:
+            del self.identity_cache[key]
 
     def get_paginated_result(self, search: str = None, order_by: str = 'created_at', order: str = 'DESC',
-                             page: int = 1, page_size: int = 10, **kwargs):
+                             page: int = 1, page_size: int = 10, cursor: str = None,
+                             total: str = PaginationTotalEnum.count,
+                             projection: typing.Union[typing.Type[BaseModel], typing.List[Column]] = None,
+                             **kwargs):
         """
         Paginate through the results
+
+        Pages are addressed by number (OFFSET) or, when `cursor` is given, by the keyset
+        of the last record of the previous page which stays fast on deep pages
         :param search:
-        :param order_by:
+        :param order_by: column name, `rank` sorts the search results by relevance
         :param order:
         :param page:
         :param page_size:
+        :param cursor: str: `next_cursor` of the previous page
+        :param total: str: `count` runs a separate count query, `window` returns the count with
+            the rows, `estimate` uses the Postgres planner statistics and `none` skips the count
+        :param projection: select only the columns of the fields of the pydantic class, returned as
+            its instances, or only the given columns, returned as dicts. Full model objects by default
         :return:
         """
-        query, total_count = self.get_list_filter_query(search=search, order_by=order_by, order=order, **kwargs)
-
-        offset_value = page * page_size - page_size
-        result = query.offset(offset_value).limit(page_size).all()
-        total_pages = math.ceil(total_count/page_size)
+        order_by = order_by or 'id'
+        if cursor and total == PaginationTotalEnum.window:
+            # The window is computed after the cursor filter, count the records separately
+            total = PaginationTotalEnum.count
+        query, total_count = self.get_list_filter_query(search=search, order_by=order_by, order=order,
+                                                        total=total, **kwargs)
+
+        if projection is not None:
+            columns = self.get_projection_columns(projection, order_by)
+            if total == PaginationTotalEnum.window:
+                columns.append(func.count().over().label('total_count'))
+            query = query.with_entities(*columns)
+
+        if cursor:
+            if order_by == SEARCH_RANK:
+                raise ApplicationError(response_code=constants.HTTP_422_UNPROCESSABLE_ENTITY,
+                                       message="Pagination cursor is not supported with rank ordering")
+            query = query.filter(self.get_cursor_filter(cursor, order_by=order_by, order=order))
+        else:
+            query = query.offset(page * page_size - page_size)
+        # Fetch one more record to know if there is a next page
+        result = query.limit(page_size + 1).all()
+        if total == PaginationTotalEnum.window:
+            if result:
+                total_count = result[0].total_count
+                if projection is None:
+                    result = [row[0] for row in result]
+            else:
+                # Nothing to read the count from when the page is past the end
+                total_count = 0 if page == 1 else self.get_list_filter_query(
+                    search=search, order_by=None, **kwargs)[1]
+        has_next_page = len(result) > page_size
+        result = result[:page_size]
+        total_pages = math.ceil(total_count/page_size) if total_count is not None else None
+        next_cursor = None
+        if has_next_page and order_by != SEARCH_RANK:
+            next_cursor = self.encode_cursor(result[-1], order_by)
+        if projection is not None:
+            result = self.project_rows(result, projection)
         return {
             "page": page,
             "page_size": page_size,
             "data": result,
             "total_count": total_count,
             "total_pages": total_pages,
-            "has_next_page": bool(page < total_pages),
-            "has_prev_page": bool(page > 1)
+            "has_next_page": has_next_page,
+            "has_prev_page": bool(cursor) or bool(page > 1),
+            "next_cursor": next_cursor
         }
 
+    def get_projection_columns(self, projection: typing.Union[typing.Type[BaseModel], typing.List[Column]],
+                               order_by: str = None) -> typing.List[Column]:
+        """
+        Columns to select for the projection, `id` and the sort column are always selected for the cursor
+        :param projection: pydantic class or list of columns
+        :param order_by:
+        :return:
+        """
+        table_columns = self.model.__table__.c
+        if isinstance(projection, type) and issubclass(projection, BaseModel):
+            names = [name for name in projection.__fields__ if name in table_columns]
+        else:
+            names = [column.key for column in projection]
+        for name in ['id', order_by]:
+            if name in table_columns and name not in names:
+                names.append(name)
+        return [getattr(self.model, name) for name in names]
+
+    @staticmethod
+    def project_rows(rows: typing.List[typing.Any],
+                     projection: typing.Union[typing.Type[BaseModel], typing.List[Column]]) -> typing.List:
+        """
+        Builds the pydantic objects or the dicts of the projection from the selected rows
+        :param rows:
+        :param projection: pydantic class or list of columns
+        :return:
+        """
+        if isinstance(projection, type) and issubclass(projection, BaseModel):
+            # Extra columns selected for the cursor are ignored by the class
+            return [projection(**row._mapping) for row in rows]
+        names = [column.key for column in projection]
+        return [{name: row._mapping[name] for name in names} for row in rows]
+
+    @staticmethod
+    def encode_cursor(record: typing.Any, order_by: str) -> str:
+        """
+        Builds the opaque cursor pointing after the given record
+        :param record: last record of the page
+        :param order_by: str: sort column
+        :return:
+        """
+        value = getattr(record, order_by)
+        if isinstance(value, (datetime.date, datetime.datetime)):
+            value = value.isoformat()
+        elif isinstance(value, decimal.Decimal):
+            value = str(value)
+        payload = json.dumps([order_by, value, record.id], separators=(',', ':'))
+        return base64.urlsafe_b64encode(payload.encode('utf-8')).decode('ascii').rstrip('=')
+
+    def decode_cursor(self, cursor: str, order_by: str) -> typing.Tuple[typing.Any, int]:
+        """
+        Returns the sort value and id stored in the cursor
+        :param cursor:
+        :param order_by:
+        :return:
+        """
+        try:
+            payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            cursor_order_by, value, id_ = json.loads(payload)
+        except (ValueError, TypeError):
+            raise ApplicationError(response_code=constants.HTTP_422_UNPROCESSABLE_ENTITY,
+                                   message="Invalid pagination cursor")
+        if cursor_order_by != order_by:
+            raise ApplicationError(response_code=constants.HTTP_422_UNPROCESSABLE_ENTITY,
+                                   message="Pagination cursor does not match the sort order")
+        if value is not None:
+            try:
+                python_type = getattr(self.model, order_by).type.python_type
+            except NotImplementedError:
+                python_type = None
+            if python_type in (datetime.datetime, datetime.date):
+                value = python_type.fromisoformat(value)
+            elif python_type is decimal.Decimal:
+                value = decimal.Decimal(value)
+        return value, id_
+
+    def get_cursor_filter(self, cursor: str, order_by: str, order: str = 'desc'):
+        """
+        Keyset condition selecting the records after the cursor, `id` breaks the ties
+        :param cursor:
+        :param order_by:
+        :param order:
+        :return:
+        """
+        value, id_ = self.decode_cursor(cursor, order_by)
+        column = self.get_sort_expression(order_by)
+        ascending = order.lower() == 'asc'
+        after_id = self.model.id > id_ if ascending else self.model.id < id_
+        # NULLs sort after the values on Postgres, before them on SQLite, so they come last or first in the walk
+        nulls_last = ascending == (self.session.get_bind().dialect.name in self.nulls_sort_high)
+        if value is None:
+            # Cursor within the NULLs, the values are all before or all after them
+            condition = and_(column.is_(None), after_id)
+            return or_(column.isnot(None), condition) if not nulls_last else condition
+        # Bound with the column type, so the value is formatted the way the column stores it
+        value = self.get_sort_expression(order_by, literal(value, getattr(self.model, order_by).type))
+        condition = or_(column > value if ascending else column < value, and_(column == value, after_id))
+        return or_(condition, column.is_(None)) if nulls_last else condition
+
+    def get_sort_expression(self, order_by: str, value: typing.Any = None):
+        """
+        Expression the records are sorted by and compared with the cursor
+
+        SQLite stores the datetimes as text, `server_default` ones without the microseconds
+        (`2024-01-01 10:00:00`) and the bound ones with (`2024-01-01 10:00:00.000000`).
+        Both are compared in the longer format, the plain column is used on the other databases
+        :param order_by: str: sort column
+        :param value: expression to normalize instead of the column
+        :return:
+        """
+        column = getattr(self.model, order_by)
+        expression = column if value is None else value
+        if isinstance(column.type, DateTime) and self.session.get_bind().dialect.name == 'sqlite':
+            return func.substr(cast(expression, String) + '.000000', 1, 26)
+        return expression
+
     def get_list_filter_query(self, search: str = None,
                               order_by: str = 'created_at', order: str = 'desc',
-                              **kwargs):
+                              total: str = PaginationTotalEnum.count, **kwargs):
         """
         Filter records with given keyword arguments
         :param search: str:
         :param order_by: str:
         :param order: str:
+        :param total: str: see `get_paginated_result`, only `count` and `estimate` return the count
         :param kwargs:
         :return:
         """
@@ -202,28 +637,73 @@ class SqlAlchemyRepository(AbstractRepository):
         if kwargs.get('is_deleted', False) is None:
             # If `is_deleted` set to `None` then ignore the `is_deleted` filter
             del kwargs['is_deleted']
-        query = self.session.query(self.model)
+        if total == PaginationTotalEnum.window:
+            # Every row carries the count of all the filtered rows
+            query = self.session.query(self.model, func.count().over().label('total_count'))
+        else:
+            query = self.session.query(self.model)
         # Use separate Count query for performance
         count_query = self.session.query(func.count(distinct(self.model.id)))
         if kwargs:
             query = query.filter_by(**kwargs)
             count_query = count_query.filter_by(**kwargs)
 
+        strategy = self.get_search_strategy()
         if search:
-            # Apply search filter
-            if len(self.search_fields) > 1:
-                # Search given value in all columns
-                query = query.filter(or_(*[field_.like(f"%{search}%") for field_ in self.search_fields]))
-                count_query = count_query.filter(or_(*[field_.like(f"%{search}%") for field_ in self.search_fields]))
-            elif len(self.search_fields) == 1:
-                query = query.filter(self.search_fields[0].like(f"%{search}%"))
-                count_query = count_query.filter(self.search_fields[0].like(f"%{search}%"))
-
+            # Apply search filter, the value is searched in all the search fields
+            condition = strategy.condition(search)
+            if condition is not None:
+                query = query.filter(condition)
+                count_query = count_query.filter(condition)
+
+        total_count = None
+        if total == PaginationTotalEnum.estimate:
+            total_count = self.estimate_count(query)
+            if total_count is None or total_count < self.estimate_threshold:
+                total = PaginationTotalEnum.count
+        if total == PaginationTotalEnum.count:
+            total_count = count_query.scalar()
+
+        if order_by == SEARCH_RANK:
+            # Best matches first, `id` keeps the order stable for equal ranks
+            rank = strategy.order(search) if search else None
+            if rank is not None:
+                return query.order_by(rank, self.model.id.desc()), total_count
+            order_by = 'id'
         if order_by:
-            # Build the order by clause
-            return query.order_by(getattr(getattr(self.model, order_by), order.lower())()), count_query.scalar()
+            # Build the order by clause, `id` keeps the order stable for equal values
+            return query.order_by(
+                getattr(self.get_sort_expression(order_by), order.lower())(),
+                getattr(self.model.id, order.lower())()
+            ), total_count
         else:
-            return query, count_query.scalar()
+            return query, total_count
+
+    def get_search_strategy(self) -> BaseSearchStrategy:
+        """
+        Search strategy for the database of the session
+        :return:
+        """
+        strategy = self.search_strategy or LikeSearch(self.search_fields)
+        return strategy.resolve(self.session.get_bind())
+
+    def estimate_count(self, query: Query) -> typing.Optional[int]:
+        """
+        Number of rows of the query estimated by the Postgres planner,
+        `None` on the other databases
+        :param query:
+        :return:
+        """
+        bind = self.session.get_bind()
+        if bind.dialect.name != 'postgresql':
+            return None
+        compiled = query.statement.compile(dialect=bind.dialect)
+        plan = self.session.connection().exec_driver_sql(
+            f"EXPLAIN (FORMAT JSON) {compiled.string}", compiled.params
+        ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return int(plan[0]['Plan']['Plan Rows'])
 
     def count_records(self, **kwargs) -> int:
         """
@@ -271,10 +751,198 @@ class RedisRepository(AbstractRepository):
     def get(self, uuid: str) -> typing.Union[dict, str, list, None]:
         return self.backend.get_dict(uuid)
 
+    def add_many(self, mapping: typing.Dict[str, typing.Union[dict, list, str]], **kwargs):
+        """
+        Saves all the records in a single round trip
+        :param mapping: key to record mapping
+        :param kwargs: `ex` expiry for all keys or a key to expiry mapping
+        :return:
+        """
+        return self.backend.set_many(mapping, **kwargs)
+
+    def get_many(self, uuids: typing.Iterable[str]) -> dict:
+        return self.backend.get_many(uuids)
+
+    def delete_many(self, uuids: typing.Iterable[str]) -> int:
+        return self.backend.delete_many(uuids)
+
+    def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        return self.backend.delete_matching(pattern, batch_size=batch_size)
+
     def update(self, data: dict, where: dict):
         raise NotImplemented("Cannot implement update record for RedisRepository")
 
 
+class AsyncRedisRepository(AbstractRepository):
+
+    @inject.autoparams('backend')
+    def __init__(self, backend: AsyncBaseBackend):
+        self.backend: AsyncBaseBackend = backend
+
+    async def _add(self, key: str, data: typing.Union[dict, list, str], **kwargs):
+        if type(data) == dict:
+            await self.backend.set_dict(key, data, **kwargs)
+        elif type(data) == list:
+            await self.backend.set_list(key, data, **kwargs)
+        elif type(data) == str:
+            await self.backend.set_str(key, data, **kwargs)
+        else:
+            raise NotImplementedError(f"Unable to save the {type(data)!r}")
+
+    async def add(self, model: CoreModel):
+        await self._add(model.public_id, {c.name: getattr(model, c.name) for c in model.__table__.columns})
+
+    async def get(self, uuid: str) -> typing.Union[dict, str, list, None]:
+        return await self.backend.get_dict(uuid)
+
+    async def add_many(self, mapping: typing.Dict[str, typing.Union[dict, list, str]], **kwargs):
+        return await self.backend.set_many(mapping, **kwargs)
+
+    async def get_many(self, uuids: typing.Iterable[str]) -> dict:
+        return await self.backend.get_many(uuids)
+
+    async def delete_many(self, uuids: typing.Iterable[str]) -> int:
+        return await self.backend.delete_many(uuids)
+
+    async def delete_matching(self, pattern: str, batch_size: int = None) -> int:
+        return await self.backend.delete_matching(pattern, batch_size=batch_size)
+
+    async def update(self, data: dict, where: dict):
+        raise NotImplementedError("Cannot implement update record for AsyncRedisRepository")
+
+
+class AsyncSqlAlchemyRepository:
+    """Asyncio variant of `SqlAlchemyRepository` on an `AsyncSession`
+
+    Every method runs the matching method of the sync `repository` class through
+    `AsyncSession.run_sync`, the queries are the same and do not block the event loop.
+    The session must be created with `expire_on_commit=False`, attributes cannot be lazy loaded.
+    """
+    repository: typing.Type[SqlAlchemyRepository] = SqlAlchemyRepository
+    model: CoreModel = None
+
+    def __init__(self, session: AsyncSession, identity_cache: dict = None):
+        """
+        :param session: sqlalchemy.ext.asyncio.AsyncSession:
+        :param identity_cache: dict: records loaded by public id, shared by the repositories of the Unit of Work
+        """
+        self.session = session
+        self.identity_cache = identity_cache if identity_cache is not None else {}
+        self.model = self.model or self.repository.model
+
+    def sync_repository(self, session: Session) -> SqlAlchemyRepository:
+        """
+        Sync repository on the session given by `run_sync`
+        :param session:
+        :return:
+        """
+        repository = self.repository(session, identity_cache=self.identity_cache)
+        repository.model = self.model
+        return repository
+
+    async def _run(self, method: str, *args, **kwargs):
+        def run(session: Session):
+            return getattr(self.sync_repository(session), method)(*args, **kwargs)
+        return await self.session.run_sync(run)
+
+    async def add(self, model: typing.Union[CoreModel, dict]):
+        return await self._run('add', model)
+
+    async def add_many(self, rows: typing.Iterable[dict], chunk_size: int = 1000) -> typing.List[str]:
+        return await self._run('add_many', rows, chunk_size=chunk_size)
+
+    async def upsert_many(self, rows: typing.Iterable[dict], conflict_cols: typing.List[str],
+                          update_cols: typing.List[str] = None, chunk_size: int = 1000):
+        return await self._run('upsert_many', rows, conflict_cols, update_cols=update_cols, chunk_size=chunk_size)
+
+    async def get(self, id_: int, is_deleted: bool = False) -> typing.Union[CoreModel, None]:
+        return await self._run('get', id_, is_deleted=is_deleted)
+
+    async def find_by_public_id(self, public_id: str, is_deleted: bool = False) -> typing.Union[CoreModel, None]:
+        return await self._run('find_by_public_id', public_id, is_deleted=is_deleted)
+
+    async def find_by_public_ids(self, public_ids: typing.Iterable[str]) -> typing.Dict[str, CoreModel]:
+        return await self._run('find_by_public_ids', public_ids)
+
+    async def update(self, values: dict, where: tuple):
+        return await self._run('update', values, where)
+
+    async def update_by(self, values: dict, where: dict):
+        return await self._run('update_by', values, where)
+
+    async def update_multiple(self, values: dict, where: tuple):
+        return await self._run('update_multiple', values, where)
+
+    async def get_single(self, **kwargs) -> typing.Union[CoreModel, None]:
+        return await self._run('get_single', **kwargs)
+
+    async def filter(self, order_by: str = None, order: str = None, **kwargs):
+        return await self._run('filter', order_by=order_by, order=order, **kwargs)
+
+    async def filter_iter(self, order_by: str = None, order: str = None, yield_per: int = 1000,
+                          columns: typing.List[Column] = None, **kwargs) -> typing.AsyncIterator:
+        """
+        Same as `SqlAlchemyRepository.filter_iter`, the rows are streamed with `AsyncSession.stream`
+        """
+        def build(session: Session) -> Query:
+            query = self.sync_repository(session).get_filter_query(order_by=order_by, order=order, **kwargs)
+            return query.with_entities(*columns) if columns else query
+        async for item in self.stream(await self.session.run_sync(build), yield_per=yield_per):
+            yield item
+
+    async def search_iter(self, search: str = None, order_by: str = 'created_at', order: str = 'desc',
+                          columns: typing.List[Column] = None, yield_per: int = 1000,
+                          **kwargs) -> typing.AsyncIterator:
+        """
+        Same as `SqlAlchemyRepository.search_iter`, the rows are streamed with `AsyncSession.stream`
+        """
+        def build(session: Session) -> Query:
+            query, _ = self.sync_repository(session).get_list_filter_query(
+                search=search, order_by=order_by or 'id', order=order, total=PaginationTotalEnum.none, **kwargs
+            )
+            return query.with_entities(*columns) if columns else query
+        async for item in self.stream(await self.session.run_sync(build), yield_per=yield_per):
+            yield item
+
+    async def stream(self, query: Query, yield_per: int = 1000) -> typing.AsyncIterator:
+        """
+        Iterates over the query results fetching `yield_per` rows at a time
+        :param query:
+        :param yield_per: int: rows fetched at a time
+        :return:
+        """
+        descriptions = query.column_descriptions
+        # Model objects for the entity queries, row tuples for the column queries
+        entity = len(descriptions) == 1 and descriptions[0]['expr'] is descriptions[0]['entity']
+        result = await self.session.stream(query.statement.execution_options(yield_per=yield_per))
+        async for row in result:
+            yield row[0] if entity else row
+
+    async def refresh(self, instance_):
+        await self.session.refresh(instance_)
+
+    async def delete(self, record: typing.Union[CoreModel, str, int]):
+        return await self._run('delete', record)
+
+    async def hard_delete(self, **kwargs):
+        return await self._run('hard_delete', **kwargs)
+
+    async def get_paginated_result(self, search: str = None, order_by: str = 'created_at', order: str = 'DESC',
+                                   page: int = 1, page_size: int = 10, cursor: str = None,
+                                   total: str = PaginationTotalEnum.count,
+                                   projection: typing.Union[typing.Type[BaseModel], typing.List[Column]] = None,
+                                   **kwargs):
+        return await self._run('get_paginated_result', search=search, order_by=order_by, order=order,
+                               page=page, page_size=page_size, cursor=cursor, total=total,
+                               projection=projection, **kwargs)
+
+    async def count_records(self, **kwargs) -> int:
+        return await self._run('count_records', **kwargs)
+
+    async def count_total_records(self, model, **kwargs) -> int:
+        return await self._run('count_total_records', model, **kwargs)
+
+
 class UserBaseSqlAlchemyRepository(SqlAlchemyRepository):
 
     def find_by_email(self, email):
@@ -294,3 +962,16 @@ class UserBaseSqlAlchemyRepository(SqlAlchemyRepository):
                 query = query.filter_by(email=email)
         rec = query.scalar()
         return bool(rec)
+
+
+class AsyncUserBaseSqlAlchemyRepository(AsyncSqlAlchemyRepository):
+    repository = UserBaseSqlAlchemyRepository
+
+    async def find_by_email(self, email):
+        return await self._run('find_by_email', email)
+
+    async def find_by_mobile(self, mobile):
+        return await self._run('find_by_mobile', mobile)
+
+    async def check_user_exists(self, email: str = None, mobile: str = None) -> bool:
+        return await self._run('check_user_exists', email=email, mobile=mobile)
@@ -8,7 +8,7 @@ from fastapi.security import OAuth2PasswordBearer
 from fastapi.security.oauth2 import get_authorization_scheme_param
 
 from service_common.settings import CoreSettings
-from service_common.enums import OrderEnum
+from service_common.enums import OrderEnum, PaginationTotalEnum
 
 
 class ResponseType(str, Enum):
@@ -81,12 +81,13 @@ class AuthenticationSchema(OAuth2PasswordBearer):
 
 class PaginationResponseSchema(BaseModel):
     data: typing.List[dict] = Field(default_factory=list, title="List of records")
-    total_count: int = Field(default=0, title="Total record count")
+    total_count: typing.Optional[int] = Field(default=0, title="Total record count")
     page_size: int = Field(default=10, title="Records per page")
     page: int = Field(default=1, title="Current Page Number")
-    total_pages: int = Field(default=1, title="Total number of pages")
+    total_pages: typing.Optional[int] = Field(default=1, title="Total number of pages")
     has_next_page: bool = Field(default=False, title="Has next page")
     has_prev_page: bool = Field(default=False, title="Has previous page")
+    next_cursor: typing.Optional[str] = Field(default=None, title="Cursor of the next page")
 
 
 class SearchPaginatedRequestSchema(BaseModel):
@@ -95,6 +96,8 @@ class SearchPaginatedRequestSchema(BaseModel):
     page_size: int = Field(default=10, title="Number of records per page", gt=0)
     order_by: str = Field(default='created_at', title="Sort records by")
     order: OrderEnum = Field(default=OrderEnum.desc, title="Sort order")
+    cursor: typing.Optional[str] = Field(default=None, title="Cursor of the requested page, overrides page")
+    total: PaginationTotalEnum = Field(default=PaginationTotalEnum.count, title="How the total count is computed")
 
 
 class PaginatedRequestSchema(BaseModel):
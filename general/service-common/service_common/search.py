@@ -0,0 +1,139 @@
+"""Provides the search strategies of the `SqlAlchemyRepository` listing
+
+`LikeSearch` scans the table, the indexed strategies need the indexes created
+by the migrations:
+    * `TrigramSearch` - pg_trgm GIN index on every search field (Postgres)
+    * `Fts5Search` - FTS5 shadow table with the trigram tokenizer (SQLite)
+"""
+import time
+import typing
+
+from sqlalchemy import Column, or_, func, select, table, column, literal_column, inspect
+from sqlalchemy.engine import Engine
+
+
+# `order_by` value sorting the search results by relevance
+SEARCH_RANK = 'rank'
+
+
+class BaseSearchStrategy:
+    """Builds the search condition and the relevance ordering of the listing
+    """
+
+    def __init__(self, fields: typing.List[Column]):
+        self.fields = fields or []
+
+    def resolve(self, bind: Engine) -> 'BaseSearchStrategy':
+        """
+        Returns the strategy to use on the database
+        :param bind: engine of the session
+        :return:
+        """
+        return self
+
+    def condition(self, search: str):
+        raise NotImplementedError
+
+    def order(self, search: str):
+        """
+        Order by clause putting the best matches first, `None` when ranking is not supported
+        :param search:
+        :return:
+        """
+        return None
+
+
+class LikeSearch(BaseSearchStrategy):
+    """Matches the term anywhere in any of the fields, works on all databases without index
+    """
+
+    def condition(self, search: str):
+        if not self.fields:
+            return None
+        return or_(*[field_.like(f"%{search}%") for field_ in self.fields])
+
+
+class TrigramSearch(LikeSearch):
+    """Postgres pg_trgm, the GIN `gin_trgm_ops` indexes serve the LIKE condition
+    """
+
+    def order(self, search: str):
+        if not self.fields:
+            return None
+        # greatest() ignores the NULL similarity of empty fields
+        return func.greatest(*[func.similarity(field_, search) for field_ in self.fields]).desc()
+
+
+class Fts5Search(BaseSearchStrategy):
+    """SQLite FTS5 shadow table using the trigram tokenizer
+
+    The trigram tokenizer matches substrings like LIKE does,
+    terms shorter than 3 characters fall back to the LIKE scan.
+    Databases created without the migrations have no FTS5 table and use the LIKE scan.
+    """
+    min_length = 3
+    # Seconds before checking again a database without the FTS5 table, the migration may run meanwhile
+    recheck_interval = 60
+
+    def __init__(self, fields: typing.List[Column], fts_table: str):
+        super().__init__(fields)
+        self.fts = table(fts_table, column('rowid'), column('rank'))
+        self.fallback = LikeSearch(fields)
+        # Database urls having the FTS5 table, the table is not expected to go away
+        self._available: typing.Set[str] = set()
+        # Time of the next check, by database url missing the FTS5 table
+        self._next_check: typing.Dict[str, float] = {}
+
+    def resolve(self, bind: Engine) -> BaseSearchStrategy:
+        url = str(bind.url)
+        if url in self._available:
+            return self
+        if time.monotonic() < self._next_check.get(url, 0):
+            return self.fallback
+        if inspect(bind).has_table(self.fts.name):
+            self._available.add(url)
+            self._next_check.pop(url, None)
+            return self
+        self._next_check[url] = time.monotonic() + self.recheck_interval
+        return self.fallback
+
+    def _match(self, search: str):
+        # Quote the term as a phrase, FTS5 query syntax in the user input is not interpreted
+        phrase = '"{}"'.format(search.replace('"', '""'))
+        return literal_column(self.fts.name).op('MATCH')(phrase)
+
+    def _id_column(self):
+        return self.fields[0].expression.table.c.id
+
+    def condition(self, search: str):
+        if len(search) < self.min_length:
+            return self.fallback.condition(search)
+        return self._id_column().in_(select(self.fts.c.rowid).where(self._match(search)))
+
+    def order(self, search: str):
+        if len(search) < self.min_length:
+            return None
+        # `rank` is the bm25 score, lower is better
+        return select(self.fts.c.rank).where(
+            self.fts.c.rowid == self._id_column(), self._match(search)
+        ).scalar_subquery().asc()
+
+
+class DialectSearch(BaseSearchStrategy):
+    """Picks the strategy by the database dialect
+    """
+
+    def __init__(self, fields: typing.List[Column], default: BaseSearchStrategy = None,
+                 **strategies: BaseSearchStrategy):
+        super().__init__(fields)
+        self.default = default or LikeSearch(fields)
+        self.strategies = strategies
+
+    def resolve(self, bind: Engine) -> BaseSearchStrategy:
+        return self.strategies.get(bind.dialect.name, self.default).resolve(bind)
+
+    def condition(self, search: str):
+        return self.default.condition(search)
+
+    def order(self, search: str):
+        return self.default.order(search)
@@ -2,6 +2,8 @@ import json
 import typing
 from pydantic import BaseSettings, PostgresDsn, validator
 
+from service_common.adapter.serializers import get_serializer
+
 SQLITE_DEV = "sqlite:///data_dev.db"
 SQLITE_TEST = "sqlite:///data_test.db"
 SQLITE_STAGE = "sqlite:///data_stage.db"
@@ -38,11 +40,51 @@ class CoreSettings(BaseSettings):
     db_pass: str = None
     db_name: str = None
     sqlalchemy_uri: str = None
+    # Derived from `sqlalchemy_uri` with the asyncpg/aiosqlite drivers when not set
+    sqlalchemy_async_uri: str = None
+    # Read replicas, the reads are routed to the replicas lagging at most `sqlalchemy_replica_max_lag` seconds
+    sqlalchemy_replica_uris: typing.List[str] = []
+    sqlalchemy_replica_max_lag: float = 5
+    sqlalchemy_replica_check_interval: float = 10
+    # Connection pool of every engine, see `service_common.engine`
+    sqlalchemy_pool_size: int = 5
+    sqlalchemy_max_overflow: int = 10
+    sqlalchemy_pool_timeout: float = 30
+    sqlalchemy_pool_recycle: int = 1800
+    sqlalchemy_pool_pre_ping: bool = True
+    # Reuse the most recently returned connection first, lets the idle connections time out server side
+    sqlalchemy_pool_use_lifo: bool = False
+    # No pooling in the worker, for PgBouncer in transaction mode
+    sqlalchemy_null_pool: bool = False
+
+    # Object store backend: redis | memory
+    cache_backend: str = 'redis'
+    memory_backend_max_entries: int = 100000
+    memory_backend_max_bytes: int = 64 * 1024 * 1024
 
     redis_host: str = 'localhost'
     redis_port: int = 6379
     redis_user: str = None
     redis_pass: str = None
+    # Format of the values written to redis: json | orjson | msgpack
+    redis_serializer: str = 'json'
+    # In-process cache in front of redis, invalidated over pub/sub
+    redis_local_cache_enabled: bool = False
+    redis_local_cache_ttl: int = 5
+    redis_local_cache_max_size: int = 10000
+
+    # In-process cache of the validated token sessions
+    token_cache_enabled: bool = False
+    token_cache_ttl: int = 5
+    token_cache_max_size: int = 10000
+
+    # Seconds the current user is shared between the workers through the object store, 0 caches per request only
+    current_user_cache_ttl: int = 0
+
+    # Password hashing pool: thread | process | inline
+    password_hash_executor: str = 'thread'
+    password_hash_workers: int = 2
+    password_hash_queue_size: int = 32
 
     aws_access_key_id: str = None
     aws_secret_access_key: str = None
@@ -61,6 +103,30 @@ class CoreSettings(BaseSettings):
     mongo_db_uri: str = None
 
     weather_api_key: str = None
+    # Upstream weather API client, see `AcuWeatherService`
+    weather_api_timeout: float = 10
+    weather_api_connect_timeout: float = 3
+    weather_api_max_connections: int = 20
+    weather_api_max_keepalive: int = 10
+    weather_api_concurrency: int = 10
+    weather_api_retries: int = 2
+    weather_api_backoff: float = 0.5
+    # Coalescing of the concurrent weather API calls, the lock extends it across the workers
+    single_flight_lock_enabled: bool = False
+    single_flight_lock_ttl: float = 10
+    single_flight_wait_interval: float = 0.1
+    # Cells of the location cache: exact | grid | geohash, see `weather_service.service.geo`
+    location_cache_quantization: str = 'grid'
+    location_cache_grid_step: float = 0.01
+    location_cache_geohash_precision: int = 6
+    # Meters around the coordinates searched for a cached location when their cell misses, 0 disables it
+    location_cache_near_radius: float = 0
+    # Seconds the weather cache records are fresh, by type
+    weather_cache_location_ttl: int = 30 * 24 * 3600
+    weather_cache_daily_ttl: int = 3 * 3600
+    weather_cache_hourly_ttl: int = 30 * 60
+    # Seconds a stale record is served while refreshed in the background, 0 disables it
+    weather_cache_stale_while_revalidate: int = 0
 
     class Config:
         # Load from .env file
@@ -90,6 +156,28 @@ class CoreSettings(BaseSettings):
 
         return SQLITE_DEV
 
+    @validator("sqlalchemy_async_uri", pre=True, always=True)
+    def assemble_async_db_connection(cls, v: typing.Optional[str],
+                                     values: typing.Dict[str, typing.Any]) -> typing.Any:
+        if isinstance(v, str):
+            return v
+        uri = str(values.get("sqlalchemy_uri") or '')
+        scheme, sep, rest = uri.partition('://')
+        if scheme in ('postgresql', 'postgres', 'postgresql+psycopg2'):
+            return f"postgresql+asyncpg://{rest}"
+        if scheme in ('sqlite', 'sqlite+pysqlite'):
+            return f"sqlite+aiosqlite://{rest}"
+        return None
+
+    @validator("redis_serializer")
+    def check_redis_serializer(cls, v: str) -> str:
+        # Fails at startup, the backend would otherwise fall back to the in-memory one
+        try:
+            get_serializer(v)
+        except ImportError as ex:
+            raise ValueError(str(ex))
+        return v
+
     @validator("mongo_db_uri", pre=True)
     def assemble_mongo_connection(cls, v: typing.Optional[str], values: typing.Dict[str, typing.Any]) -> typing.Any:
         if isinstance(v, str):
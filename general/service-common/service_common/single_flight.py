@@ -0,0 +1,126 @@
+"""
+Coalesces the concurrent calls for the same key into a single call
+
+Within the worker the callers of a key await the call already in flight.
+With a backend the workers also take a lock on the key, the workers missing
+the lock wait for the result to show up through the `check` callable instead
+of calling again.
+"""
+import time
+import typing
+import asyncio
+import inspect
+from logging import getLogger
+
+from service_common.adapter.base import AsyncBaseBackend
+from service_common.metrics import register_metrics
+
+
+logger = getLogger(__name__)
+
+T = typing.TypeVar('T')
+
+
+class SingleFlight:
+    """
+    Runs a single call per key at once, every caller gets its result
+    """
+
+    def __init__(self, backend: AsyncBaseBackend = None, lock_ttl: float = 10, wait_interval: float = 0.1,
+                 prefix: str = 'single_flight', name: str = 'single_flight'):
+        """
+        :param backend: AsyncBaseBackend: holds the locks shared by the workers, in-process coalescing only if `None`
+        :param lock_ttl: float: seconds the lock is held at most, also the longest wait for another worker
+        :param wait_interval: float: seconds between two `check` calls while another worker holds the lock
+        :param prefix: str: prefix of the lock keys
+        :param name: str: name of the metrics
+        """
+        self.backend = backend
+        self.lock_ttl = lock_ttl
+        self.wait_interval = wait_interval
+        self.prefix = prefix
+        self._flights: typing.Dict[str, asyncio.Task] = {}
+        self.calls = 0
+        self.coalesced = 0
+        self.remote_waits = 0
+        register_metrics(name, self.metrics)
+
+    async def do(self, key: str, fn: typing.Callable[[], typing.Awaitable[T]],
+                 check: typing.Callable = None) -> T:
+        """
+        Calls `fn` unless a call for the key is already in flight
+        :param key: str: identifies the call
+        :param fn: coroutine function making the call
+        :param check: function or coroutine function returning the result stored by another worker,
+            `None` if not stored yet
+        :return: result of the call
+        """
+        return await asyncio.shield(self.start(key, fn, check))
+
+    def start(self, key: str, fn: typing.Callable[[], typing.Awaitable[T]],
+              check: typing.Callable = None) -> asyncio.Task:
+        """
+        Starts the call in the background unless a call for the key is already in flight
+        :param key: str: identifies the call
+        :param fn: coroutine function making the call
+        :param check: see `do`
+        :return: task of the call in flight
+        """
+        task = self._flights.get(key)
+        if task is None:
+            self.calls += 1
+            # The call runs in its own task, a cancelled caller does not cancel the other waiters
+            task = asyncio.ensure_future(self._call(key, fn, check))
+            self._flights[key] = task
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            self.coalesced += 1
+        return task
+
+    def _finished(self, key: str, task: asyncio.Task):
+        if self._flights.get(key) is task:
+            del self._flights[key]
+        if not task.cancelled() and task.exception() is not None:
+            # Retrieved here in case every caller went away or the call ran in the background
+            logger.error(f"Call {key!r} failed: {task.exception()!r}")
+
+    async def _call(self, key: str, fn: typing.Callable[[], typing.Awaitable[T]],
+                    check: typing.Callable = None) -> T:
+        if self.backend is None:
+            return await fn()
+        lock_key = f'{self.prefix}:{key}'
+        deadline = time.monotonic() + self.lock_ttl
+        while True:
+            token = await self.backend.acquire_lock(lock_key, self.lock_ttl)
+            if token:
+                try:
+                    # The previous holder may have stored the result meanwhile
+                    result = await self._check(check)
+                    return result if result is not None else await fn()
+                finally:
+                    await self.backend.release_lock(lock_key, token)
+            if time.monotonic() >= deadline:
+                logger.warning(f"Waited {self.lock_ttl}s for {lock_key!r}, calling without the lock")
+                return await fn()
+            self.remote_waits += 1
+            await asyncio.sleep(self.wait_interval)
+            result = await self._check(check)
+            if result is not None:
+                return result
+
+    @staticmethod
+    async def _check(check: typing.Callable = None) -> typing.Any:
+        if check is None:
+            return None
+        result = check()
+        if inspect.isawaitable(result):
+            result = await result
+        return result
+
+    def metrics(self) -> dict:
+        return {
+            'calls': self.calls,
+            'coalesced': self.coalesced,
+            'remote_waits': self.remote_waits,
+            'in_flight': len(self._flights),
+        }
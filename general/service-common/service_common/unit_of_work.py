@@ -2,8 +2,12 @@ import abc
 import logging
 import inject
 from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from service_common.adapter.base import BaseBackend
-from service_common.adapter.redis_token import TokenRedisRepository
+from service_common.adapter.redis_token import TokenRedisRepository, AsyncTokenRedisRepository
+from service_common.adapter.user_cache import CurrentUserCache, AsyncCurrentUserCache
+from service_common.domains import User
+from service_common.replica import RoutingSession
 
 logger = logging.getLogger(__name__)
 
@@ -17,13 +21,24 @@ def default_session_factory() -> Session:
     return inject.instance(Session)
 
 
+def default_async_session_factory() -> AsyncSession:
+    """
+    Default asyncio DB Session Factory
+    :return:
+    """
+    logger.info("Creating asyncio databse Session")
+    return inject.instance(AsyncSession)
+
+
 class AbstractUnitOfWork(abc.ABC):
     # Database session
     session: Session = None
     tokens: TokenRedisRepository = None
+    user_cache: CurrentUserCache = None
 
     def __init__(self):
         self.tokens = TokenRedisRepository()
+        self.user_cache = CurrentUserCache()
 
     def __enter__(self) -> 'AbstractUnitOfWork':
         return self
@@ -51,7 +66,7 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
     current_user_id: str = None
     current_user = None
 
-    def __init__(self, session: Session = None, session_factory=default_session_factory):
+    def __init__(self, session: Session = None, session_factory=default_session_factory, read_only: bool = False):
         """
         Either the session object or session_factory need to be provided
         If session object is passed it will be passed down to the repository
@@ -59,10 +74,16 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
         And then passed it down to the repository
         :param session: sqlalchemy.orm.Session:
         :param session_factory: Callable: which returns the session object
+        :param read_only: bool: with read replicas configured, `False` uses the primary only, `True` reads
+            from the replicas only and `None` reads from the replicas until the first write.
+            The pure read paths opt into the replicas with `reading`
         """
         self.session = session
         self.session_factory = session_factory
+        self.read_only = self.default_read_only = read_only
         self.close_on_exit = False
+        # Records loaded by public id in the current context, see `SqlAlchemyRepository.find_by_public_id`
+        self.identity_cache = {}
         super(SqlAlchemyUnitOfWork, self).__init__()
 
     def __enter__(self):
@@ -75,16 +96,163 @@ class SqlAlchemyUnitOfWork(AbstractUnitOfWork):
             # Session is not initialized so creating new session
             self.session = self.session_factory()  # type: Session
             self.close_on_exit = True
+        # Used by `RoutingSession` to pick the primary or a read replica, the routing of a previous context
+        # does not carry over
+        self.session.info['read_only'] = self.read_only
+        self.session.info.pop('primary', None)
+        self.session.info.pop('replica', None)
         return self
 
     def __exit__(self, *args):
         super().__exit__(*args)
+        # Records are detached or expired after the context
+        self.identity_cache.clear()
+        self.read_only = self.default_read_only
         if self.close_on_exit:
             # Close the session only if it is started in the context manager
             self.session.close()
 
+    def reading(self) -> 'SqlAlchemyUnitOfWork':
+        """
+        Reads the next context from the read replicas, for the pure read paths: `with self.uow.reading():`
+        :return:
+        """
+        self.read_only = True
+        return self
+
+    def load_current_user(self):
+        """
+        Loads `current_user` from the request cache, then the shared cache and at last the `users` repository
+        :return:
+        """
+        if (
+                not self.current_user_id
+                or (self.current_user and self.current_user.public_id == self.current_user_id)
+        ):
+            return
+        user = self.user_cache.get(self.current_user_id)
+        if user is None:
+            record = self._read_current_user()
+            if record is None:
+                # Unknown user, nothing cached and `current_user` stays unset
+                return
+            user = User.from_orm(record)
+            self.user_cache.set(user)
+        self.current_user: User = user
+
+    def _read_current_user(self):
+        read_only = self.session.info.get('read_only')
+        if (
+                not isinstance(self.session, RoutingSession) or self.session.router is None
+                or read_only is not False or self.session.info.get('primary')
+        ):
+            # Single database or already routed, the record stays cached for the unit
+            return self.users.find_by_public_id(self.current_user_id)
+        # A pure read, taken from a read replica even in a unit using the primary
+        self.session.info['read_only'] = None
+        try:
+            record = self.users.find_by_public_id(self.current_user_id)
+        finally:
+            self.session.info['read_only'] = read_only
+        if record is not None:
+            # Read again from the primary if the unit loads the user
+            self.identity_cache.pop((self.users.model.__tablename__, self.current_user_id), None)
+            self.session.expunge(record)
+        return record
+
     def _commit(self):
         self.session.commit()
 
     def rollback(self):
         self.session.rollback()
+
+
+class AbstractAsyncUnitOfWork(abc.ABC):
+    # Database session
+    session: AsyncSession = None
+    tokens: AsyncTokenRedisRepository = None
+    user_cache: AsyncCurrentUserCache = None
+
+    def __init__(self):
+        self.tokens = AsyncTokenRedisRepository()
+        self.user_cache = AsyncCurrentUserCache()
+
+    async def __aenter__(self) -> 'AbstractAsyncUnitOfWork':
+        return self
+
+    async def __aexit__(self, *args):
+        await self.rollback()
+
+    async def commit(self):
+        await self._commit()
+
+    @abc.abstractmethod
+    async def _commit(self):
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    async def rollback(self):
+        raise NotImplementedError
+
+
+class AsyncSqlAlchemyUnitOfWork(AbstractAsyncUnitOfWork):
+    """
+    SQLAlchemy asyncio Unit of Work, used with `async with`
+    """
+
+    current_user_id: str = None
+    current_user = None
+
+    def __init__(self, session: AsyncSession = None, session_factory=default_async_session_factory):
+        """
+        Either the session object or session_factory need to be provided, see `SqlAlchemyUnitOfWork`
+        :param session: sqlalchemy.ext.asyncio.AsyncSession:
+        :param session_factory: Callable: which returns the session object
+        """
+        self.session = session
+        self.session_factory = session_factory
+        self.close_on_exit = False
+        # Records loaded by public id in the current context, see `SqlAlchemyRepository.find_by_public_id`
+        self.identity_cache = {}
+        super(AsyncSqlAlchemyUnitOfWork, self).__init__()
+
+    async def __aenter__(self):
+        await super().__aenter__()
+        if not self.session:
+            # Session is not initialized so creating new session
+            self.session = self.session_factory()  # type: AsyncSession
+            self.close_on_exit = True
+        return self
+
+    async def __aexit__(self, *args):
+        await super().__aexit__(*args)
+        # Records are detached or expired after the context
+        self.identity_cache.clear()
+        if self.close_on_exit:
+            # Close the session only if it is started in the context manager
+            await self.session.close()
+
+    async def load_current_user(self):
+        """
+        asyncio variant of `SqlAlchemyUnitOfWork.load_current_user`
+        :return:
+        """
+        if (
+                not self.current_user_id
+                or (self.current_user and self.current_user.public_id == self.current_user_id)
+        ):
+            return
+        user = await self.user_cache.get(self.current_user_id)
+        if user is None:
+            record = await self.users.find_by_public_id(self.current_user_id)
+            if record is None:
+                return
+            user = User.from_orm(record)
+            await self.user_cache.set(user)
+        self.current_user: User = user
+
+    async def _commit(self):
+        await self.session.commit()
+
+    async def rollback(self):
+        await self.session.rollback()
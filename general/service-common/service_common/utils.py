@@ -6,7 +6,6 @@ import logging
 import typing
 from datetime import timedelta, datetime
 
-from passlib.context import CryptContext
 from fastapi.encoders import jsonable_encoder
 from fastapi.responses import JSONResponse
 from fastapi.security.oauth2 import get_authorization_scheme_param
@@ -16,11 +15,11 @@ from service_common.settings import CoreSettings
 from service_common.error_conf import ErrorConfig
 from service_common.error import BaseError, ApplicationError
 from service_common.schema import ResponseSchema, ResponseType
+from service_common.hashing import PasswordHasher
 
 from service_common import constants
 
 logger = logging.getLogger('app')
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 QUANTITY_NORM_MAP = {
     'KG': {'multiplier': 1, 'unit': 'KG'},
     'TON': {'multiplier': 1000, 'unit': 'KG'},
@@ -105,18 +104,30 @@ def respond(code: int = 0, exc: BaseError = None, message: str = None,
 
 
 def verify_password(plain_password, hashed_password):
-    try:
-        return pwd_context.verify(plain_password, hashed_password)
-    except Exception as exp:
-        logger.error(f"Unable to verify password {exp}", exc_info=True)
-        return True
+    return inject.instance(PasswordHasher).verify(plain_password, hashed_password)
 
 
 def get_password_hash(password):
-    try:
-        return pwd_context.hash(password)
-    except Exception:
-        return password
+    return inject.instance(PasswordHasher).hash(password)
+
+
+async def verify_password_async(plain_password, hashed_password):
+    """
+    Verifies the password on the hashing pool without blocking the event loop
+    :param plain_password:
+    :param hashed_password:
+    :return:
+    """
+    return await inject.instance(PasswordHasher).verify_async(plain_password, hashed_password)
+
+
+async def get_password_hash_async(password):
+    """
+    Hashes the password on the hashing pool without blocking the event loop
+    :param password:
+    :return:
+    """
+    return await inject.instance(PasswordHasher).hash_async(password)
 
 
 def get_token_data(token, auto_error=True):
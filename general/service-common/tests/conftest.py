@@ -0,0 +1,17 @@
+import sys
+from os.path import abspath, join
+
+import inject
+import pytest
+
+# Adjust the paths
+sys.path.insert(0, abspath(join(__file__, "../", "../")))
+
+from service_common.error_conf import ErrorConfig  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def injector():
+    inject.clear_and_configure(lambda binder: binder.bind_to_constructor(ErrorConfig, ErrorConfig))
+    yield
+    inject.clear()
@@ -0,0 +1,62 @@
+import re
+
+import pytest
+from sqlalchemy import create_engine, text, Column, String, JSON
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import Session, declarative_base
+
+from service_common.enums import UserTypeEnum
+from service_common.model import CoreModel
+from service_common.repository import SqlAlchemyRepository
+
+Base = declarative_base()
+
+ESCAPES = {'t': '\t', 'n': '\n', 'r': '\r'}
+
+
+class ProfileModel(Base, CoreModel):
+    __tablename__ = 'bulk_profile'
+
+    user_type = Column(String, nullable=False)
+    details = Column(JSON)
+
+
+class ProfileRepository(SqlAlchemyRepository):
+    model = ProfileModel
+
+
+ROWS = [
+    {'user_type': UserTypeEnum.farmer, 'details': {'crops': ['wheat', 'rice'], 'acres': 2.5}},
+    {'user_type': UserTypeEnum.buyer, 'details': [1, {'nested': None}]},
+    {'user_type': 'FPO', 'details': {'name': 'tab\tand\nnew line'}},
+]
+
+
+@pytest.fixture
+def repository():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        yield ProfileRepository(session)
+
+
+def unescape(value: str):
+    if value == '\\N':
+        return None
+    return re.sub(r'\\(.)', lambda match: ESCAPES.get(match.group(1), match.group(1)), value)
+
+
+def test_copy_matches_executemany(repository):
+    # executemany path, the values stored as text by SQLite
+    repository.add_many([dict(row) for row in ROWS])
+    stored = repository.session.execute(
+        text(f"SELECT user_type, details FROM {ProfileModel.__tablename__} ORDER BY id")
+    ).all()
+
+    # COPY path, the input built for Postgres
+    columns, buffer = repository._copy_buffer(repository._stamp_rows([dict(row) for row in ROWS]),
+                                              postgresql.dialect())
+    copied = [dict(zip(columns, map(unescape, line.split('\t')))) for line in buffer.read().splitlines()]
+
+    assert [(row['user_type'], row['details']) for row in copied] == [tuple(row) for row in stored]
+    assert [row['user_type'] for row in copied] == ['FARMER', 'BUYER', 'FPO']
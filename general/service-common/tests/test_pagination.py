@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+from sqlalchemy import create_engine, Column, String
+from sqlalchemy.orm import Session, declarative_base
+
+from service_common.model import CoreModel
+from service_common.repository import SqlAlchemyRepository
+
+Base = declarative_base()
+
+
+class RecordModel(Base, CoreModel):
+    __tablename__ = 'pagination_record'
+
+    name = Column(String(32))
+
+
+class RecordRepository(SqlAlchemyRepository):
+    model = RecordModel
+
+
+@pytest.fixture
+def repository():
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        # `created_at` of these is set by the `server_default`, without the microseconds
+        session.add_all([RecordModel(name=f'default-{index}') for index in range(7)])
+        # and of these by the bound values, with the microseconds
+        created_at = datetime.datetime(2022, 11, 10, 7, 30)
+        session.add_all([
+            RecordModel(name='bound-0', created_at=created_at),
+            RecordModel(name='bound-1', created_at=created_at),
+            RecordModel(name='bound-2', created_at=created_at + datetime.timedelta(microseconds=1)),
+        ])
+        session.commit()
+        yield RecordRepository(session)
+
+
+def walk(repository: RecordRepository, order: str, order_by: str = 'created_at'):
+    pages = []
+    cursor = None
+    while True:
+        result = repository.get_paginated_result(order_by=order_by, order=order, page_size=3, cursor=cursor)
+        pages.append([record.id for record in result['data']])
+        cursor = result['next_cursor']
+        if not result['has_next_page']:
+            return pages
+        assert len(pages) <= 10, "Pagination does not advance"
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_cursor_pages_do_not_overlap(repository, order):
+    pages = walk(repository, order)
+    ids = [id_ for page in pages for id_ in page]
+
+    assert len(pages) == 4
+    assert len(ids) == len(set(ids)) == 10
+    # Same order as the offset pagination
+    offset_ids = [record.id for record in repository.get_paginated_result(
+        order_by='created_at', order=order, page_size=10)['data']]
+    assert ids == offset_ids
+
+
+@pytest.mark.parametrize('order', ['asc', 'desc'])
+def test_cursor_pages_through_nulls(repository, order):
+    # `name` is nullable, NULLs between the pages and as the sort value of the cursors
+    for record in repository.session.query(RecordModel).filter(RecordModel.id % 2 == 0):
+        record.name = None
+    repository.session.commit()
+
+    pages = walk(repository, order, order_by='name')
+    ids = [id_ for page in pages for id_ in page]
+
+    assert len(ids) == len(set(ids)) == 10
+    offset_ids = [record.id for record in repository.get_paginated_result(
+        order_by='name', order=order, page_size=10)['data']]
+    assert ids == offset_ids
@@ -0,0 +1,55 @@
+"""user search indexes
+
+Revision ID: 7f3a2fffeb3e
+Revises: c9b05cfb62f3
+Create Date: 2026-10-18 20:10:12.418204
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = '7f3a2fffeb3e'
+down_revision = 'c9b05cfb62f3'
+branch_labels = None
+depends_on = None
+
+SEARCH_FIELDS = ['first_name', 'middle_name', 'last_name']
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        # Trigram GIN indexes serve the `LIKE '%term%'` search and the similarity ranking
+        op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+        for field in SEARCH_FIELDS:
+            op.create_index(f'ix_site_user_{field}_trgm', 'site_user', [field],
+                            postgresql_using='gin', postgresql_ops={field: 'gin_trgm_ops'})
+    elif dialect == 'sqlite':
+        # External content FTS5 table kept in sync with `site_user` by the triggers
+        fields = ', '.join(SEARCH_FIELDS)
+        new_values = ', '.join(f'new.{field}' for field in SEARCH_FIELDS)
+        old_values = ', '.join(f'old.{field}' for field in SEARCH_FIELDS)
+        op.execute(f"CREATE VIRTUAL TABLE site_user_fts USING fts5("
+                   f"{fields}, content='site_user', content_rowid='id', tokenize='trigram')")
+        op.execute(f"CREATE TRIGGER site_user_fts_ai AFTER INSERT ON site_user BEGIN "
+                   f"INSERT INTO site_user_fts(rowid, {fields}) VALUES (new.id, {new_values}); END")
+        op.execute(f"CREATE TRIGGER site_user_fts_ad AFTER DELETE ON site_user BEGIN "
+                   f"INSERT INTO site_user_fts(site_user_fts, rowid, {fields}) "
+                   f"VALUES ('delete', old.id, {old_values}); END")
+        op.execute(f"CREATE TRIGGER site_user_fts_au AFTER UPDATE ON site_user BEGIN "
+                   f"INSERT INTO site_user_fts(site_user_fts, rowid, {fields}) "
+                   f"VALUES ('delete', old.id, {old_values}); "
+                   f"INSERT INTO site_user_fts(rowid, {fields}) VALUES (new.id, {new_values}); END")
+        op.execute("INSERT INTO site_user_fts(site_user_fts) VALUES ('rebuild')")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        for field in SEARCH_FIELDS:
+            op.drop_index(f'ix_site_user_{field}_trgm', table_name='site_user')
+    elif dialect == 'sqlite':
+        for trigger in ['site_user_fts_ai', 'site_user_fts_ad', 'site_user_fts_au']:
+            op.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        op.execute("DROP TABLE IF EXISTS site_user_fts")
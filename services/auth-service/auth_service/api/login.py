@@ -17,7 +17,7 @@ async def login_request(
         user_login: login.AuthRequest
 ):
     service = AuthenticatorService()
-    return service.verify_password(user_login.user_name, password=user_login.password)
+    return await service.verify_password(user_login.user_name, password=user_login.password)
 
 
 @router.delete('/auth', response_model=ResponseSchema)
@@ -25,7 +25,7 @@ async def logout_request(
         current_user_id: str = Depends(get_authorised_user)
 ):
     service = AuthenticatorService(current_user_id=current_user_id)
-    service.logout()
+    await service.logout()
     return respond(constants.RESPONSE_OK, message="Logged out successfully")
 
 
@@ -59,7 +59,7 @@ async def get_token(
     service = AuthenticatorService()
     if username.find('@') > 0:
         # If email is provided, we will look for the Password authentication
-        return service.verify_password(username, password)
+        return await service.verify_password(username, password)
     else:
         # Consider we want to do the Phone OTP based authentication
         # Before getting Authenticated Please call POST auth/otp API manually
@@ -4,7 +4,7 @@ import typing
 from pydantic import BaseModel, Field
 
 from service_common.schema import BaseRequestSchema, PaginationResponseSchema, SearchPaginatedRequestSchema
-from service_common.enums import UserTypeEnum
+from service_common.enums import UserTypeEnum, OrderEnum, ExportFormatEnum
 
 
 class UserRequestSchema(BaseRequestSchema):
@@ -39,6 +39,15 @@ class UserSearchPaginatedRequestSchema(SearchPaginatedRequestSchema):
     user_type: UserTypeEnum = UserTypeEnum.field_agent
 
 
+class UserExportRequestSchema(BaseModel):
+    export_format: ExportFormatEnum = Field(default=ExportFormatEnum.ndjson, title="Format of the export")
+    search: str = Field(default=None, title="Filter records")
+    user_type: typing.Optional[UserTypeEnum] = Field(default=None, title="Export only this type of users")
+    created_by: typing.Optional[str] = Field(default=None, title="Export only the users created by this user")
+    order_by: str = Field(default='created_at', title="Sort records by")
+    order: OrderEnum = Field(default=OrderEnum.desc, title="Sort order")
+
+
 class EntitySchema(BaseModel):
     name: str = Field(default=None, title="Name of the entity")
     count: int = Field(default=0, title="Count of the entity", ge=0)
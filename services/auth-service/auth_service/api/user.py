@@ -1,7 +1,9 @@
 from fastapi import Depends, Form
+from fastapi.responses import StreamingResponse
 from service_common.router import APIRouter
 from service_common.schema import ResponseSchema, SearchPaginatedRequestSchema
 from service_common.domains import UserSearchPaginatedParameters
+from service_common.enums import ExportFormatEnum
 
 from auth_service.api.schema import user
 from auth_service import constants
@@ -25,11 +27,31 @@ async def get_users(
     return result
 
 
+@router.get("/export", response_class=StreamingResponse)
+async def export_users(
+        export: user.UserExportRequestSchema = Depends(user.UserExportRequestSchema),
+        current_user: str = Depends(get_authorised_user)
+):
+    service = UserService(current_user_id=current_user)
+    if export.export_format == ExportFormatEnum.csv:
+        media_type, extension = 'text/csv', 'csv'
+    else:
+        media_type, extension = 'application/x-ndjson', 'ndjson'
+    # Raises before the response starts, the errors get their status
+    rows = service.export_users(**export.dict())
+    # The sync generator is consumed in the thread pool as the client reads the response
+    return StreamingResponse(
+        rows,
+        media_type=media_type,
+        headers={'Content-Disposition': f'attachment; filename="users.{extension}"'}
+    )
+
+
 @router.post("", response_model=ResponseSchema)
 async def create_user(user_form: user.UserRequestSchema, current_user: str = Depends(get_authorised_user)):
     service = UserService(current_user_id=current_user)
     entity = domain.UserDb(**user_form.dict(exclude_none=True, exclude={'device_id'}))
-    entity.set_pass_hash(user_form.password)
+    await entity.set_pass_hash_async(user_form.password)
     await service.create_user(entity)
     return respond(constants.HTTP_201_CREATED)
 
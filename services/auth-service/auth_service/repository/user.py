@@ -1,6 +1,7 @@
 import typing
 from sqlalchemy import func, or_
-from service_common.repository import SqlAlchemyRepository
+from service_common.repository import SqlAlchemyRepository, AsyncSqlAlchemyRepository
+from service_common.search import DialectSearch, TrigramSearch, Fts5Search
 from auth_service.model.user import UserModel
 from auth_service import model
 from service_common.enums import UserTypeEnum
@@ -9,6 +10,12 @@ from service_common.enums import UserTypeEnum
 class UserSqlAlchemyRepository(SqlAlchemyRepository):
     model: UserModel = UserModel
     search_fields = [UserModel.first_name, UserModel.middle_name, UserModel.last_name]
+    # Indexes are created by the `user_search_indexes` migration
+    search_strategy = DialectSearch(
+        search_fields,
+        postgresql=TrigramSearch(search_fields),
+        sqlite=Fts5Search(search_fields, fts_table='site_user_fts'),
+    )
 
     def find_by_email(self, email):
         return self.session.query(self.model).filter_by(email=email).first()
@@ -50,3 +57,23 @@ class UserSqlAlchemyRepository(SqlAlchemyRepository):
             map_.append({"user_type": UserTypeEnum.farmer, "public_id": user.public_id})
 
         return map_
+
+
+class AsyncUserSqlAlchemyRepository(AsyncSqlAlchemyRepository):
+    repository = UserSqlAlchemyRepository
+
+    async def find_by_email(self, email):
+        return await self._run('find_by_email', email)
+
+    async def find_by_mobile(self, mobile):
+        return await self._run('find_by_mobile', mobile)
+
+    async def get_users_count_by_type(self, created_by: str = None):
+        return await self._run('get_users_count_by_type', created_by=created_by)
+
+    async def check_user_exists(self, email: str = None, mobile: str = None, public_id: str = None) -> bool:
+        return await self._run('check_user_exists', email=email, mobile=mobile, public_id=public_id)
+
+    @staticmethod
+    def get_user_map(user: UserModel):
+        return UserSqlAlchemyRepository.get_user_map(user)
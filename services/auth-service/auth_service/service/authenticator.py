@@ -2,13 +2,14 @@ import logging
 import inject
 
 from service_common.utils import (
-    verify_password,
+    verify_password_async,
     create_access_token
 )
 from service_common.error import ApplicationError
 from service_common.utils import respond
 from service_common.settings import CoreSettings
 from service_common.service.base import BaseService
+from service_common.adapter.redis_token import AsyncTokenRedisRepository
 
 from auth_service import constants
 from auth_service.service.unit_of_work import UnitOfWork
@@ -25,39 +26,46 @@ class AuthenticatorService(BaseService):
         self.uow = uow
         self.uow.current_user_id = current_user_id
 
-    def verify_password(self, user_name: str, password: str):
+    async def verify_password(self, user_name: str, password: str):
         with self.uow:
             user = self.uow.users.find_by_email(user_name)
             if not user:
                 raise ApplicationError(response_code=constants.USER_NOT_REGISTERED, message="User does not exists")
+            password_hash = user.password_hash
 
-            if user and verify_password(password, user.password_hash):
-                access = {}
-                data = {'sub': user.public_id}
-                access['token'] = create_access_token(data)
-                access['t_type'] = 'access'
-                access['user_id'] = user.id
-                access['user_public_id'] = user.public_id
-                access['is_revoked'] = False
-                access['user_type_map'] = self.uow.users.get_user_map(user)
-
-                self.uow.tokens.add_token(user.public_id, access)
-                return AuthResponse(
-                    email=user.email, phone=user.mobile, access_token=access.get('token'),
-                    public_id=user.public_id, user_type=user.user_type,
-                    first_name=user.first_name, middle_name=user.middle_name,
-                    last_name=user.last_name, user_type_map=access['user_type_map'] or []
-                )
-
+        # Out of the unit of work, its DB connection is not held while waiting for the hashing pool
+        if not await verify_password_async(password, password_hash):
             raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User password is wrong")
 
-    def logout(self) -> None:
+        with self.uow:
+            user = self.uow.users.find_by_email(user_name)
+            if not user or user.password_hash != password_hash:
+                # Removed or password changed while verifying
+                raise ApplicationError(response_code=constants.HTTP_401_UNAUTHORIZED, message="User password is wrong")
+            access = {}
+            data = {'sub': user.public_id}
+            access['token'] = create_access_token(data)
+            access['t_type'] = 'access'
+            access['user_id'] = user.id
+            access['user_public_id'] = user.public_id
+            access['is_revoked'] = False
+            access['user_type_map'] = self.uow.users.get_user_map(user)
+
+            self.uow.tokens.add_token(user.public_id, access)
+            return AuthResponse(
+                email=user.email, phone=user.mobile, access_token=access.get('token'),
+                public_id=user.public_id, user_type=user.user_type,
+                first_name=user.first_name, middle_name=user.middle_name,
+                last_name=user.last_name, user_type_map=access['user_type_map'] or []
+            )
+
+    async def logout(self) -> None:
         """
 
         :return:
         """
-        with self.uow:
-            self.uow.tokens.delete(self.current_user_id)
+        tokens = AsyncTokenRedisRepository()
+        await tokens.delete(self.current_user_id)
 
     def send_otp(self, phone_number: str):
         with self.uow:
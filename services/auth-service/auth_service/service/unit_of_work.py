@@ -1,7 +1,6 @@
-from service_common.unit_of_work import SqlAlchemyUnitOfWork
-from service_common.domains import User
+from service_common.unit_of_work import SqlAlchemyUnitOfWork, AsyncSqlAlchemyUnitOfWork
 
-from auth_service.repository.user import UserSqlAlchemyRepository
+from auth_service.repository.user import UserSqlAlchemyRepository, AsyncUserSqlAlchemyRepository
 
 
 class UnitOfWork(SqlAlchemyUnitOfWork):
@@ -19,12 +18,22 @@ class UnitOfWork(SqlAlchemyUnitOfWork):
     def __enter__(self):
         super(UnitOfWork, self).__enter__()
         # initialize repositories after connecting to DB
-        self.users = UserSqlAlchemyRepository(self.session)
-        if (
-                self.current_user_id
-                and (not self.current_user
-                     or self.current_user.public_id != self.current_user_id)
-        ):
-            # Load current user
-            user = self.users.find_by_public_id(self.current_user_id)
-            self.current_user: User = User.from_orm(user)
+        self.users = UserSqlAlchemyRepository(self.session, identity_cache=self.identity_cache)
+        # Load current user, cached for the request
+        self.load_current_user()
+
+
+class AsyncUnitOfWork(AsyncSqlAlchemyUnitOfWork):
+    """
+    asyncio variant of `UnitOfWork`, used with `async with`
+    """
+    users: AsyncUserSqlAlchemyRepository = None
+
+    async def __aenter__(self):
+        await super(AsyncUnitOfWork, self).__aenter__()
+        # initialize repositories after connecting to DB
+        self.users = AsyncUserSqlAlchemyRepository(self.session, identity_cache=self.identity_cache)
+
+        # Load current user, cached for the request
+        await self.load_current_user()
+        return self
@@ -1,14 +1,25 @@
+import io
+import csv
+import json
+import typing
+import contextlib
+
 import inject
 
 from service_common.service.base import BaseService
 from service_common.domains import User
 from service_common.domains import SearchPaginatedParameters
 from service_common.error import ApplicationError
+from service_common.enums import ExportFormatEnum
 
 from auth_service.service.unit_of_work import UnitOfWork
 from auth_service import constants
 
 
+# Columns of the user export, in the order of the CSV header
+EXPORT_FIELDS = ['public_id', 'email', 'mobile', 'user_type', 'first_name', 'middle_name', 'last_name']
+
+
 class UserService(BaseService):
 
     @inject.autoparams('uow')
@@ -19,16 +30,82 @@ class UserService(BaseService):
 
     async def list_users(self, paginate: SearchPaginatedParameters) -> dict:
         result = []
-        with self.uow:
+        with self.uow.reading():
 
+            # Select only the columns of the domain
             paginated = self.uow.users.get_paginated_result(
+                projection=User,
                 **paginate.dict(),
             )
             for item in paginated.get('data', []) or []:
-                result.append(User.from_orm(item).dict())
+                result.append(item.dict())
             paginated['data'] = result
         return paginated
 
+    def export_users(self, export_format: ExportFormatEnum = ExportFormatEnum.ndjson, search: str = None,
+                     user_type: str = None, created_by: str = None, order_by: str = 'created_at',
+                     order: str = 'desc', chunk_size: int = 500) -> typing.Iterator[str]:
+        """
+        Checks the current user and builds the query of the export, the errors are raised here before
+        the response starts. The returned iterator streams the users as NDJSON lines or CSV rows,
+        `chunk_size` rows at a time, see `_export_rows`
+        :param export_format:
+        :param search:
+        :param user_type:
+        :param created_by:
+        :param order_by:
+        :param order:
+        :param chunk_size: int: rows per chunk of the response
+        :return:
+        """
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(self.uow.reading())
+            if not self.uow.current_user:
+                raise ApplicationError(response_code=constants.RECORD_NOT_FOUND, message='User not found')
+            filters = {}
+            if user_type:
+                filters['user_type'] = user_type
+            if created_by:
+                filters['created_by'] = created_by
+            if self.uow.current_user.user_type not in ['ADMIN', 'SUPER_ADMIN']:
+                # Only the users created by the current user, like the dashboard
+                filters['created_by'] = self.current_user_id
+            columns = [getattr(self.uow.users.model, name) for name in EXPORT_FIELDS]
+            rows = self.uow.users.search_iter(search=search, order_by=order_by, order=order,
+                                              columns=columns, yield_per=chunk_size, **filters)
+            # Ends the transaction of the checks, the rows are read from the thread pool on a connection
+            # checked out there. The unit of work stays open while they are streamed, closed by the iterator
+            self.uow.rollback()
+            unit = stack.pop_all()
+        return self._export_rows(unit, rows, export_format, chunk_size)
+
+    @staticmethod
+    def _export_rows(unit: contextlib.ExitStack, rows: typing.Iterator, export_format: ExportFormatEnum,
+                     chunk_size: int) -> typing.Iterator[str]:
+        """
+        Serializes the rows, read through a server side cursor, the memory stays flat whatever the number of users
+        :param unit: closes the unit of work of the rows
+        :param rows:
+        :param export_format:
+        :param chunk_size:
+        :return:
+        """
+        with unit:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            if export_format == ExportFormatEnum.csv:
+                writer.writerow(EXPORT_FIELDS)
+            for count, row in enumerate(rows, start=1):
+                if export_format == ExportFormatEnum.csv:
+                    writer.writerow(row)
+                else:
+                    buffer.write(json.dumps(dict(row._mapping)) + '\n')
+                if count % chunk_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
     async def create_user(self, user: User):
         with self.uow:
             self.uow.users.add(user.dict(exclude_none=True))
@@ -46,6 +123,10 @@ class UserService(BaseService):
             data = user_rec.dict(exclude={'public_id'}, exclude_unset=True)
             self.uow.users.update_by(values=data, where={'public_id': user.public_id})
             self.uow.commit()
+            # Drop the cached copies of the user, loaded again by the next unit of work
+            self.uow.user_cache.delete(user.public_id)
+            if self.uow.current_user and self.uow.current_user.public_id == user.public_id:
+                self.uow.current_user = None
 
     async def get_dashboard(self):
         with self.uow:
@@ -0,0 +1,79 @@
+import asyncio
+
+import httpx
+import pytest
+
+from service_common import constants
+from service_common.error import ApplicationError
+from weather_service.service.acuweather import AcuWeatherService
+
+
+def service(handler) -> AcuWeatherService:
+    """
+    Client answered by the handler, to create in the running event loop
+    """
+    acuweather = AcuWeatherService('KEY', retries=2, backoff=0)
+    acuweather._client = httpx.AsyncClient(base_url=acuweather.base_url, transport=httpx.MockTransport(handler))
+    acuweather._slots = asyncio.Semaphore(acuweather.concurrency)
+    acuweather._loop = asyncio.get_running_loop()
+    return acuweather
+
+
+def test_unauthorized_is_not_returned_as_data():
+    calls = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        calls.append(request)
+        return httpx.Response(401, json={'Code': 'Unauthorized', 'Message': 'Api Authorization failed'})
+
+    async def main():
+        acuweather = service(handler)
+        try:
+            return await acuweather.get_daily_forecast('204848')
+        finally:
+            await acuweather.close()
+
+    with pytest.raises(ApplicationError) as error:
+        asyncio.run(main())
+    assert error.value.http_code == constants.HTTP_502_BAD_GATEWAY
+    # Not a transient failure, not retried
+    assert len(calls) == 1
+
+
+def test_success_is_decoded():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json={'Key': '204848', 'apikey': request.url.params['apikey']})
+
+    async def main():
+        acuweather = service(handler)
+        try:
+            return await acuweather.get_location_key(18.52, 73.85)
+        finally:
+            await acuweather.close()
+
+    assert asyncio.run(main()) == {'Key': '204848', 'apikey': 'KEY'}
+
+
+def test_invalid_json_is_not_returned_as_data():
+    def handler(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, text='<html>Down for maintenance</html>')
+
+    async def main():
+        acuweather = service(handler)
+        try:
+            return await acuweather.get_hourly_forecast('204848')
+        finally:
+            await acuweather.close()
+
+    with pytest.raises(ApplicationError) as error:
+        asyncio.run(main())
+    assert error.value.http_code == constants.HTTP_502_BAD_GATEWAY
+
+
+def test_client_of_previous_loop_is_closed():
+    acuweather = AcuWeatherService('KEY')
+    clients = [asyncio.run(acuweather.get_client()), asyncio.run(acuweather.get_client())]
+
+    assert clients[0].is_closed
+    assert not clients[1].is_closed
+    asyncio.run(acuweather.close())
@@ -17,7 +17,7 @@ async def get_daily_forecast(
         current_user: str = Depends(get_authorised_user)
 ):
     service = WeatherService()
-    resp = service.get_daily_forecast(location.lat, location.long)
+    resp = await service.get_daily_forecast(location.lat, location.long)
     if resp:
         return resp
 
@@ -26,6 +26,6 @@ async def get_daily_forecast(
 async def get_hourly_forecast(location: schema.LocationSchema = Depends(schema.LocationSchema),
                               current_user: str = Depends(get_authorised_user)):
     service = WeatherService()
-    resp = service.get_hourly_forecast(location.lat, location.long)
+    resp = await service.get_hourly_forecast(location.lat, location.long)
     if resp:
         return {"HourlyForecasts": resp}
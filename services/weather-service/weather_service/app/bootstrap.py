@@ -11,8 +11,14 @@ def init_app():
     from service_common.bootstrap import create_app
     # Loading apps
     from weather_service import api
+    from weather_service.service.acuweather import AcuWeatherService
+    from weather_service.repository.weather_cache import WeatherCacheRepository
 
     api_ = create_app(typing.cast(Settings, inject.instance(CoreSettings)))
+    # Close the keep-alive connections of the weather API client
+    api_.add_event_handler('shutdown', inject.instance(AcuWeatherService).close)
+    # Indexes of the weather cache lookups
+    api_.add_event_handler('startup', lambda: WeatherCacheRepository().ensure_indexes())
     return api_
 
 
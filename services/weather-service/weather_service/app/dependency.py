@@ -4,20 +4,29 @@ import inject
 import logging
 from functools import lru_cache
 
-from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm.session import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 from pymongo import MongoClient
 
 from service_common.settings import CoreSettings
+from service_common.engine import create_engine, create_async_engine
+from service_common.replica import ReplicaRouter, RoutingSession
+from service_common.single_flight import SingleFlight
 from service_common.adapter.redis_adapter import BaseBackend
 from service_common.adapter.redis_adapter import RedisBackend
+from service_common.adapter.redis_adapter import AsyncBaseBackend
+from service_common.adapter.redis_adapter import AsyncRedisBackend
+from service_common.adapter.tiered_adapter import TieredBackend, AsyncTieredBackend
+from service_common.adapter.memory_adapter import MemoryBackend, AsyncMemoryBackend
 from service_common.service.storage_s3 import StorageS3, Storage
 
 from weather_service.settings import Settings
 from weather_service.error_conf import ErrorConfig
-from weather_service.service.unit_of_work import UnitOfWork
+from weather_service.service.unit_of_work import UnitOfWork, AsyncUnitOfWork
 from weather_service.service.acuweather import AcuWeatherService
+from weather_service.service.geo import LocationQuantizer
+from weather_service.service.cache_policy import WeatherCachePolicy, CACHE_LOCATION, CACHE_DAILY, CACHE_HOURLY
 
 
 logger = logging.getLogger(__name__)
@@ -34,30 +43,116 @@ def sql_alchemy_session_factory() -> sessionmaker:
     """
     settings = get_settings()
     engine = create_engine(
-        settings.sqlalchemy_uri
+        settings.sqlalchemy_uri, settings
     )
+    if settings.sqlalchemy_replica_uris:
+        logger.info("Initializing SQLAlchemy Session Maker with read replicas")
+        router = ReplicaRouter(
+            engine,
+            [create_engine(uri, settings, name=f'replica_{index}')
+             for index, uri in enumerate(settings.sqlalchemy_replica_uris)],
+            max_lag=settings.sqlalchemy_replica_max_lag,
+            check_interval=settings.sqlalchemy_replica_check_interval
+        )
+        return sessionmaker(autocommit=False, autoflush=False, bind=engine, class_=RoutingSession, router=router)
     logger.info("Initializing SQLAlchemy Session Maker")
     return sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
+def async_sql_alchemy_session_factory() -> typing.Optional[sessionmaker]:
+    """"
+    SQLAlchemy asyncio Session Maker
+    """
+    settings = get_settings()
+    if not settings.sqlalchemy_async_uri:
+        logger.warning("No asyncio driver for the database, asyncio Unit of Work is disabled")
+        return None
+    try:
+        engine = create_async_engine(
+            settings.sqlalchemy_async_uri, settings
+        )
+    except ImportError as ex:
+        # The routes using the asyncio Unit of Work fail until the driver is installed
+        logger.warning(f"asyncio driver {ex.name or ex} is not installed, asyncio Unit of Work is disabled. "
+                       f"Install asyncpg for Postgres or aiosqlite for SQLite")
+        return None
+    logger.info("Initializing SQLAlchemy asyncio Session Maker")
+    # Attributes cannot be lazy loaded on asyncio, keep them loaded after commit
+    return sessionmaker(autocommit=False, autoflush=False, expire_on_commit=False,
+                        bind=engine, class_=AsyncSession)
+
+
+def get_memory_backend() -> MemoryBackend:
+    """
+    Gets the in-memory object store Backend
+    :return:
+    """
+    logger.info("Initializing in-memory Backend")
+    settings = get_settings()
+    return MemoryBackend(
+        max_entries=settings.memory_backend_max_entries,
+        max_bytes=settings.memory_backend_max_bytes,
+        serializer=settings.redis_serializer
+    )
+
+
 def get_backend() -> BaseBackend:
     """
     Gets the object store Backend
     :return:
     """
-    logger.info("Initializing Redis Backend")
     settings = get_settings()
+    if settings.cache_backend == 'memory':
+        return get_memory_backend()
+    logger.info("Initializing Redis Backend")
     try:
         backend = RedisBackend(
             host=settings.redis_host,
             port=settings.redis_port,
             password=settings.redis_pass,
-            username=settings.redis_user
+            username=settings.redis_user,
+            serializer=settings.redis_serializer
         )
+        if settings.redis_local_cache_enabled:
+            backend = TieredBackend(
+                backend,
+                max_size=settings.redis_local_cache_max_size,
+                ttl=settings.redis_local_cache_ttl
+            )
     except Exception as ex:
         logger.fatal(f"Unable to instantiate RedisBackend with Exception {ex}",
                      exc_info=True)
-        backend = BaseBackend()
+        backend = get_memory_backend()
+
+    return backend
+
+
+def get_async_backend() -> AsyncBaseBackend:
+    """
+    Gets the asyncio object store Backend
+    :return:
+    """
+    settings = get_settings()
+    if settings.cache_backend == 'memory':
+        return AsyncMemoryBackend(get_memory_backend())
+    logger.info("Initializing asyncio Redis Backend")
+    try:
+        backend = AsyncRedisBackend(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            password=settings.redis_pass,
+            username=settings.redis_user,
+            serializer=settings.redis_serializer
+        )
+        if settings.redis_local_cache_enabled:
+            # Shares the local cache and invalidation listener of the sync backend
+            tiered = get_backend()
+            if isinstance(tiered, TieredBackend):
+                backend = AsyncTieredBackend(backend, tiered=tiered)
+    except Exception as ex:
+        logger.fatal(f"Unable to instantiate AsyncRedisBackend with Exception {ex}",
+                     exc_info=True)
+        backend = AsyncMemoryBackend(get_memory_backend())
 
     return backend
 
@@ -70,7 +165,52 @@ def get_s3_storage() -> StorageS3:
 
 def get_weather_service() -> AcuWeatherService:
     settings = get_settings()
-    return AcuWeatherService(api_key=settings.weather_api_key)
+    return AcuWeatherService(
+        api_key=settings.weather_api_key,
+        timeout=settings.weather_api_timeout,
+        connect_timeout=settings.weather_api_connect_timeout,
+        max_connections=settings.weather_api_max_connections,
+        max_keepalive_connections=settings.weather_api_max_keepalive,
+        concurrency=settings.weather_api_concurrency,
+        retries=settings.weather_api_retries,
+        backoff=settings.weather_api_backoff
+    )
+
+
+def get_single_flight(backend: AsyncBaseBackend) -> SingleFlight:
+    """
+    Coalescing of the weather API calls, across the workers with the lock enabled
+    :param backend: holds the locks
+    :return:
+    """
+    settings = get_settings()
+    return SingleFlight(
+        backend=backend if settings.single_flight_lock_enabled else None,
+        lock_ttl=settings.single_flight_lock_ttl,
+        wait_interval=settings.single_flight_wait_interval,
+        prefix='weather_flight'
+    )
+
+
+def get_location_quantizer() -> LocationQuantizer:
+    settings = get_settings()
+    return LocationQuantizer(
+        mode=settings.location_cache_quantization,
+        grid_step=settings.location_cache_grid_step,
+        geohash_precision=settings.location_cache_geohash_precision
+    )
+
+
+def get_weather_cache_policy() -> WeatherCachePolicy:
+    settings = get_settings()
+    return WeatherCachePolicy(
+        ttls={
+            CACHE_LOCATION: settings.weather_cache_location_ttl,
+            CACHE_DAILY: settings.weather_cache_daily_ttl,
+            CACHE_HOURLY: settings.weather_cache_hourly_ttl,
+        },
+        stale_while_revalidate=settings.weather_cache_stale_while_revalidate
+    )
 
 
 def get_mongo_client() -> typing.Optional[MongoClient]:
@@ -89,7 +229,12 @@ def configure_dependency(binder: inject.Binder):
     # bind instances
     binder.bind(CoreSettings, get_settings())
     binder.bind(BaseBackend, get_backend())
+    async_backend = get_async_backend()
+    binder.bind(AsyncBaseBackend, async_backend)
     binder.bind(AcuWeatherService, get_weather_service())
+    binder.bind(SingleFlight, get_single_flight(async_backend))
+    binder.bind(LocationQuantizer, get_location_quantizer())
+    binder.bind(WeatherCachePolicy, get_weather_cache_policy())
 
     # Singleton Error configuration
     binder.bind_to_constructor(ErrorConfig, ErrorConfig)
@@ -97,8 +242,14 @@ def configure_dependency(binder: inject.Binder):
 
     # Always return the new SQLAlchemy Session
     binder.bind_to_provider(Session, sql_alchemy_session_factory())
-    binder.bind_to_provider(MongoClient, get_mongo_client)
+    # Single client per worker, it holds the connection pool
+    binder.bind_to_constructor(MongoClient, get_mongo_client)
     binder.bind_to_provider(UnitOfWork, UnitOfWork)
 
+    async_session_factory = async_sql_alchemy_session_factory()
+    if async_session_factory:
+        binder.bind_to_provider(AsyncSession, async_session_factory)
+        binder.bind_to_provider(AsyncUnitOfWork, AsyncUnitOfWork)
+
 
 inject.configure(configure_dependency)
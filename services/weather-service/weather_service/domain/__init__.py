@@ -9,8 +9,11 @@ class CachedData(BaseDomain):
     _protected_fields: list = []
 
     public_id: str = Field(default=0, exclude=True)
-    created_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
-    modified_at: datetime.datetime = Field(default_factory=datetime.datetime.now)
+    # UTC like the dates stored by Mongo
+    created_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    modified_at: datetime.datetime = Field(default_factory=datetime.datetime.utcnow)
+    # Dropped by the TTL index past this date, see `weather_service.service.cache_policy`
+    expires_at: datetime.datetime = None
     response: typing.Union[list, dict] = Field(default_factory=dict)
 
 
@@ -19,6 +22,10 @@ class CachedLocation(CachedData):
 
     latitude: decimal.Decimal = None
     longitude: decimal.Decimal = None
+    # Cell of the coordinates, see `weather_service.service.geo`
+    cell: str = None
+    # GeoJSON point of the coordinates
+    point: dict = None
 
     class Config:
         orm_mode = True
@@ -1,7 +1,14 @@
 import typing
+import decimal
+import datetime
 import inject
+from logging import getLogger
 
-from pymongo import MongoClient
+from pymongo import MongoClient, ASCENDING, GEOSPHERE
+from pymongo.errors import PyMongoError, DuplicateKeyError
+
+
+logger = getLogger(__name__)
 
 
 class WeatherCacheRepository:
@@ -16,53 +23,97 @@ class WeatherCacheRepository:
             self.forecast = client.weather.forecast
             self.location = client.weather.location
 
+    @staticmethod
+    def _upsert(collection, key: dict, data: dict):
+        """
+        Replaces the cached document of the key, `created_at` is kept from the first write
+        :param collection:
+        :param key: fields of the unique index
+        :param data:
+        :return:
+        """
+        # BSON has no Decimal, the coordinates are stored as double
+        data = {k: float(v) if isinstance(v, decimal.Decimal) else v for k, v in data.items()}
+        created_at = data.pop('created_at', None)
+        update = {'$set': data, '$setOnInsert': {'created_at': created_at}}
+        try:
+            return collection.update_one(key, update, upsert=True)
+        except DuplicateKeyError:
+            # A concurrent upsert inserted the document first, update it
+            return collection.update_one(key, update, upsert=True)
+
     def cache_location(self, data: dict):
         if not self.is_enabled:
             return None
-        result = self.location.indert_one(
-            data
-        )
-        """
-        result = self.location.update_one(
-            {'latitude': data.get('latitude'),
-             'longitude': data.get('longitude')},
-            data,
-            upsert=True
-        )
-        """
-        return result
+        return self._upsert(self.location, {'cell': data.get('cell')}, data)
 
     def cache_forecast(self, data: dict):
         if not self.is_enabled:
             return None
-        result = self.forecast.indert_one(
+        return self._upsert(
+            self.forecast,
+            {'location_key': data.get('location_key'), 'type': data.get('type')},
             data
         )
+
+    def ensure_indexes(self):
         """
-        self.forecast.update_one(
-            {'location_key': data.get('location_key'), 'type': data.get('type')},
-            data,
-            upsert=True
-        )
+        Creates the indexes of the cache lookups, called at startup
+        :return:
         """
-        return result
+        if not self.is_enabled:
+            return
+        try:
+            cell_index = self.location.index_information().get('cell')
+            if cell_index and not cell_index.get('unique'):
+                # Created without the unique constraint by the previous release
+                self.location.drop_index('cell')
+            # One document per cell and per location key and type, the lookups are served by these indexes
+            self.location.create_index([('cell', ASCENDING)], name='cell', unique=True)
+            self.forecast.create_index([('location_key', ASCENDING), ('type', ASCENDING)],
+                                       name='location_key_type', unique=True)
+            self.location.create_index([('point', GEOSPHERE)], name='point_2dsphere')
+            # Hard expiry, the documents are dropped once `expires_at` is past
+            for collection in (self.location, self.forecast):
+                collection.create_index([('expires_at', ASCENDING)], name='expires_at_ttl', expireAfterSeconds=0)
+        except PyMongoError as e:
+            logger.error(f"Unable to create the weather cache indexes: {e}")
 
-    def find_location(self, lat, long):
+    @staticmethod
+    def _not_expired() -> dict:
+        # The TTL monitor runs once a minute, expired documents may still be there
+        return {'expires_at': {'$gt': datetime.datetime.utcnow()}}
+
+    def find_location(self, cell: str):
+        """
+        Cached location of the cell
+        :param cell: str: cell id of the coordinates, see `weather_service.service.geo`
+        :return:
+        """
         if not self.is_enabled:
             return None
-        result = self.location.find_one({'latitude': lat, 'longitude': long})
-        if type(result) is list:
-            result = result.pop(0)
-        # Validate if cached record in valid
+        result = self.location.find_one({'cell': cell, **self._not_expired()})
+        # Freshness of the record is checked by `WeatherCachePolicy`
         return result
 
+    def find_nearest_location(self, point: dict, max_distance: float):
+        """
+        Nearest cached location within `max_distance` meters of the GeoJSON point
+        :param point:
+        :param max_distance: float: radius in meters
+        :return:
+        """
+        if not self.is_enabled:
+            return None
+        return self.location.find_one(
+            {'point': {'$nearSphere': {'$geometry': point, '$maxDistance': max_distance}}, **self._not_expired()}
+        )
+
     def find_forecast(self, loc_key, type_):
         if not self.is_enabled:
             return None
         result = self.forecast.find_one(
-            {'location_key': loc_key, 'type': type_}
+            {'location_key': loc_key, 'type': type_, **self._not_expired()}
         )
-        if type(result) is list:
-            result = result.pop(0)
-        # Validate if cached record in valid
+        # Freshness of the record is checked by `WeatherCachePolicy`
         return result
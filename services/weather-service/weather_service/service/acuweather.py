@@ -1,55 +1,182 @@
-import inject
-import requests
-import urllib
-from service_common.settings import CoreSettings
+import random
+import typing
+import asyncio
+from logging import getLogger
+
+import httpx
+
+from service_common import constants
+from service_common.error import ApplicationError
+from service_common.metrics import register_metrics
+
+
+logger = getLogger(__name__)
+
+# Upstream answers worth another attempt
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
 
 
 class AcuWeatherService:
+    """
+    AccuWeather API client
+
+    The calls share a keep-alive connection pool, at most `concurrency` calls are sent at once.
+    Timeouts, connection errors and the `RETRY_STATUS_CODES` answers are retried `retries` times
+    with a jittered exponential backoff.
+    """
     base_url: str = "http://dataservice.accuweather.com"
     api_key: str = None
 
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, timeout: float = 10, connect_timeout: float = 3, max_connections: int = 20,
+                 max_keepalive_connections: int = 10, concurrency: int = 10, retries: int = 2,
+                 backoff: float = 0.5, max_backoff: float = 5):
+        """
+        :param api_key:
+        :param timeout: float: seconds to wait for the upstream answer
+        :param connect_timeout: float: seconds to wait for the connection
+        :param max_connections: int: connections of the pool
+        :param max_keepalive_connections: int: idle connections kept open
+        :param concurrency: int: calls sent at once, the others wait for a free slot
+        :param retries: int: attempts after the first failed one
+        :param backoff: float: base delay of the retries in seconds
+        :param max_backoff: float: longest delay between two attempts
+        """
         self.api_key = api_key
+        self.timeout = httpx.Timeout(timeout, connect=connect_timeout)
+        self.limits = httpx.Limits(max_connections=max_connections,
+                                   max_keepalive_connections=max_keepalive_connections)
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self._client: typing.Optional[httpx.AsyncClient] = None
+        self._slots: typing.Optional[asyncio.Semaphore] = None
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._requests = 0
+        self._retries = 0
+        self._failures = 0
+        self._in_flight = 0
+        register_metrics('acuweather', self.metrics)
+
+    async def get_client(self) -> httpx.AsyncClient:
+        """
+        Shared client, created in the running event loop
+        :return:
+        """
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            # Connections and the semaphore cannot be used from another event loop
+            if self._client is not None:
+                await self._close_stale(self._client)
+            self._client = httpx.AsyncClient(base_url=self.base_url, timeout=self.timeout, limits=self.limits)
+            self._slots = asyncio.Semaphore(self.concurrency)
+            self._loop = loop
+        return self._client
 
-    def get_location_key(self, lat, long):
+    @staticmethod
+    async def _close_stale(client: httpx.AsyncClient):
+        try:
+            await client.aclose()
+        except Exception as ex:
+            # Connections of a closed event loop cannot be shut down cleanly, they are dropped
+            logger.warning(f"Unable to close the AccuWeather client of the previous event loop: {ex!r}")
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def _delay(self, attempt: int) -> float:
+        # Full jitter, spreads the retries of the concurrent calls
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    async def _get(self, endpoint: str, params: dict) -> typing.Any:
+        """
+        Calls the endpoint, retrying the transient failures
+        :param endpoint:
+        :param params:
+        :return: decoded JSON answer
+        """
+        client = await self.get_client()
+        params = {"apikey": self.api_key, **params}
+        for attempt in range(self.retries + 1):
+            error = None
+            async with self._slots:
+                self._requests += 1
+                self._in_flight += 1
+                try:
+                    resp = await client.get(endpoint, params=params)
+                except httpx.TransportError as ex:
+                    error = ex
+                else:
+                    if resp.status_code not in RETRY_STATUS_CODES:
+                        return self._decode(endpoint, resp)
+                    error = f"HTTP {resp.status_code}"
+                finally:
+                    self._in_flight -= 1
+            if attempt < self.retries:
+                self._retries += 1
+                delay = self._delay(attempt)
+                logger.warning(f"AccuWeather {endpoint} failed with {error!r}, retrying in {delay:.2f}s")
+                await asyncio.sleep(delay)
+        self._failures += 1
+        logger.error(f"AccuWeather {endpoint} failed with {error!r} after {self.retries + 1} attempts")
+        raise ApplicationError(response_code=constants.HTTP_503_SERVICE_UNAVAILABLE,
+                               message="Weather service is not available. Please try again.")
+
+    def _decode(self, endpoint: str, resp: httpx.Response) -> typing.Any:
+        """
+        Decodes the successful answer, the other ones must not be cached as weather data
+        :param endpoint:
+        :param resp:
+        :return: decoded JSON answer
+        """
+        if resp.is_success:
+            try:
+                return resp.json()
+            except ValueError as ex:
+                # Maintenance pages and truncated bodies
+                error = f"an invalid body {ex!r}"
+        else:
+            # Invalid API key, exhausted quota or unknown location, another attempt gives the same answer
+            error = repr(resp.text[:200])
+        self._failures += 1
+        logger.error(f"AccuWeather {endpoint} answered HTTP {resp.status_code} with {error}")
+        raise ApplicationError(response_code=constants.HTTP_502_BAD_GATEWAY,
+                               message="Weather service is not available. Please try again.")
+
+    async def get_location_key(self, lat, long):
         endpoint = "locations/v1/cities/geoposition/search"
         params = {
-            "apikey": self.api_key,
             "q": f"{lat},{long}",
             "language": "en-us",
             "details": "false",
             "toplevel": "false"
         }
-        params = urllib.parse.urlencode(params)
-        url = f"{self.base_url}/{endpoint}?{params}"
-        resp = requests.get(url)
-        data = resp.json()
-        return data
+        return await self._get(endpoint, params)
 
-    def get_daily_forecast(self, loc_key):
+    async def get_daily_forecast(self, loc_key):
         endpoint = "forecasts/v1/daily/5day"
         params = {
-            "apikey": self.api_key,
             "language": "en-us",
             "details": "True",
             "metric": "True"
         }
-        params = urllib.parse.urlencode(params)
-        url = f"{self.base_url}/{endpoint}/{loc_key}?{params}"
-        resp = requests.get(url)
-        data = resp.json()
-        return data
+        return await self._get(f"{endpoint}/{loc_key}", params)
 
-    def get_hourly_forecast(self, loc_key):
+    async def get_hourly_forecast(self, loc_key):
         endpoint = "forecasts/v1/hourly/12hour"
         params = {
-            "apikey": self.api_key,
             "language": "en-us",
             "details": "True",
             "metric": "True"
         }
-        params = urllib.parse.urlencode(params)
-        url = f"{self.base_url}/{endpoint}/{loc_key}?{params}"
-        resp = requests.get(url)
-        data = resp.json()
-        return data
+        return await self._get(f"{endpoint}/{loc_key}", params)
+
+    def metrics(self) -> dict:
+        return {
+            'requests': self._requests,
+            'retries': self._retries,
+            'failures': self._failures,
+            'in_flight': self._in_flight,
+        }
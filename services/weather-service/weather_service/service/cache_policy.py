@@ -0,0 +1,57 @@
+"""
+Freshness of the weather cache records
+
+A record is fresh for the `ttl` of its type. With `stale_while_revalidate` set,
+the record is still served for that many seconds after it went stale while it is
+refreshed in the background. Past both it expires, Mongo drops it with the TTL
+index on `expires_at`.
+"""
+import typing
+import datetime
+
+CACHE_LOCATION = 'LOCATION'
+CACHE_DAILY = 'DAILY'
+CACHE_HOURLY = 'HOURLY'
+
+STATE_FRESH = 'fresh'
+STATE_STALE = 'stale'
+STATE_EXPIRED = 'expired'
+
+
+class WeatherCachePolicy:
+    """
+    Time to live of the weather cache records by type
+    """
+
+    def __init__(self, ttls: typing.Dict[str, int], stale_while_revalidate: int = 0):
+        """
+        :param ttls: seconds a record is fresh, by type
+        :param stale_while_revalidate: int: seconds a stale record is served while refreshed, 0 disables it
+        """
+        self.ttls = ttls
+        self.stale_while_revalidate = stale_while_revalidate
+
+    def expires_at(self, type_: str, modified_at: datetime.datetime) -> datetime.datetime:
+        """
+        Time the record of the type is dropped
+        :param type_:
+        :param modified_at: time the record was written, UTC
+        :return:
+        """
+        return modified_at + datetime.timedelta(seconds=self.ttls[type_] + self.stale_while_revalidate)
+
+    def state(self, type_: str, modified_at: typing.Optional[datetime.datetime]) -> str:
+        """
+        Whether the record is fresh, stale but usable or expired
+        :param type_:
+        :param modified_at: time the record was written, UTC
+        :return:
+        """
+        if modified_at is None:
+            return STATE_EXPIRED
+        age = (datetime.datetime.utcnow() - modified_at).total_seconds()
+        if age <= self.ttls[type_]:
+            return STATE_FRESH
+        if age <= self.ttls[type_] + self.stale_while_revalidate:
+            return STATE_STALE
+        return STATE_EXPIRED
@@ -0,0 +1,89 @@
+"""
+Quantizes the coordinates into the cells of the location cache
+
+Requests from nearby coordinates fall in the same cell and share its cached location key.
+    * `exact` - one cell per coordinates, as the coordinates are sent
+    * `grid` - rounds the coordinates to a multiple of `grid_step` degrees, 0.01 is about 1.1km
+    * `geohash` - geohash of `geohash_precision` characters, 6 is about 1.2km x 0.6km
+"""
+import typing
+
+QUANTIZATION_EXACT = 'exact'
+QUANTIZATION_GRID = 'grid'
+QUANTIZATION_GEOHASH = 'geohash'
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def geohash(lat: float, lon: float, precision: int = 6) -> str:
+    """
+    Encodes the coordinates as a geohash
+    :param lat:
+    :param lon:
+    :param precision: int: number of characters
+    :return:
+    """
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    value = 0
+    even = True
+    while len(chars) < precision:
+        # Bits alternate between the longitude and the latitude, starting with the longitude
+        coord, range_ = (lon, lon_range) if even else (lat, lat_range)
+        middle = (range_[0] + range_[1]) / 2
+        if coord >= middle:
+            value = (value << 1) | 1
+            range_[0] = middle
+        else:
+            value = value << 1
+            range_[1] = middle
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(GEOHASH_ALPHABET[value])
+            bits = 0
+            value = 0
+    return ''.join(chars)
+
+
+def geo_point(lat: float, lon: float) -> dict:
+    """
+    GeoJSON point of the coordinates, indexed by the `2dsphere` index
+    :param lat:
+    :param lon:
+    :return:
+    """
+    return {'type': 'Point', 'coordinates': [float(lon), float(lat)]}
+
+
+class LocationQuantizer:
+    """
+    Maps the coordinates to the cell id of the location cache
+    """
+
+    def __init__(self, mode: str = QUANTIZATION_GRID, grid_step: float = 0.01, geohash_precision: int = 6):
+        if mode not in (QUANTIZATION_EXACT, QUANTIZATION_GRID, QUANTIZATION_GEOHASH):
+            raise ValueError(f"Unknown location quantization {mode!r}")
+        self.mode = mode
+        self.grid_step = grid_step
+        self.geohash_precision = geohash_precision
+        # Decimals of the grid cell ids, so that 0.1 + 0.2 gives the same id as 0.3
+        self._decimals = max(len(f'{grid_step:f}'.rstrip('0').partition('.')[2]), 0)
+
+    def cell(self, lat: typing.Union[float, str], lon: typing.Union[float, str]) -> str:
+        """
+        Cell id of the coordinates
+        :param lat:
+        :param lon:
+        :return:
+        """
+        lat, lon = float(lat), float(lon)
+        if self.mode == QUANTIZATION_GEOHASH:
+            return f'gh:{geohash(lat, lon, self.geohash_precision)}'
+        if self.mode == QUANTIZATION_GRID:
+            lat = round(lat / self.grid_step) * self.grid_step
+            lon = round(lon / self.grid_step) * self.grid_step
+            return f'grid:{lat:.{self._decimals}f},{lon:.{self._decimals}f}'
+        return f'exact:{lat!r},{lon!r}'
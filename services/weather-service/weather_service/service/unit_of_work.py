@@ -1,7 +1,6 @@
-from service_common.unit_of_work import SqlAlchemyUnitOfWork
-from service_common.repository import UserBaseSqlAlchemyRepository
+from service_common.unit_of_work import SqlAlchemyUnitOfWork, AsyncSqlAlchemyUnitOfWork
+from service_common.repository import UserBaseSqlAlchemyRepository, AsyncUserBaseSqlAlchemyRepository
 from weather_service.repository.weather_cache import WeatherCacheRepository
-from service_common.domains import User
 
 
 class UnitOfWork(SqlAlchemyUnitOfWork):
@@ -20,14 +19,26 @@ class UnitOfWork(SqlAlchemyUnitOfWork):
     def __enter__(self):
         super(UnitOfWork, self).__enter__()
         # initialize repositories after connecting to DB
-        self.users = UserBaseSqlAlchemyRepository(self.session)
+        self.users = UserBaseSqlAlchemyRepository(self.session, identity_cache=self.identity_cache)
         self.cache = WeatherCacheRepository()
 
-        if (
-                self.current_user_id
-                and (not self.current_user
-                     or self.current_user.public_id != self.current_user_id)
-        ):
-            # Load current user
-            user = self.users.find_by_public_id(self.current_user_id)
-            self.current_user: User = User.from_orm(user)
+        # Load current user, cached for the request
+        self.load_current_user()
+
+
+class AsyncUnitOfWork(AsyncSqlAlchemyUnitOfWork):
+    """
+    asyncio variant of `UnitOfWork`, used with `async with`
+    """
+    users: AsyncUserBaseSqlAlchemyRepository = None
+    cache: WeatherCacheRepository = None
+
+    async def __aenter__(self):
+        await super(AsyncUnitOfWork, self).__aenter__()
+        # initialize repositories after connecting to DB
+        self.users = AsyncUserBaseSqlAlchemyRepository(self.session, identity_cache=self.identity_cache)
+        self.cache = WeatherCacheRepository()
+
+        # Load current user, cached for the request
+        await self.load_current_user()
+        return self
@@ -1,4 +1,10 @@
+import typing
+
 import inject
+from service_common.settings import CoreSettings
+from service_common.single_flight import SingleFlight
+from weather_service.service.geo import LocationQuantizer, geo_point
+from weather_service.service.cache_policy import WeatherCachePolicy, CACHE_LOCATION, STATE_FRESH, STATE_STALE
 from weather_service.service.acuweather import AcuWeatherService
 from weather_service.service.unit_of_work import UnitOfWork
 from weather_service import domain
@@ -7,67 +13,149 @@ from weather_service import domain
 class WeatherService:
     backend: AcuWeatherService = None
 
-    @inject.autoparams('uow', 'backend')
-    def __init__(self, uow: UnitOfWork, backend: AcuWeatherService):
+    @inject.autoparams('uow', 'backend', 'flights', 'quantizer', 'cache_policy', 'settings')
+    def __init__(self, uow: UnitOfWork, backend: AcuWeatherService, flights: SingleFlight,
+                 quantizer: LocationQuantizer, cache_policy: WeatherCachePolicy, settings: CoreSettings):
         self.uow = uow
         self.backend = backend
+        # Shared by the requests of the worker, coalesces the upstream calls on cache miss
+        self.flights = flights
+        self.quantizer = quantizer
+        self.cache_policy = cache_policy
+        # Radius in meters reusing the location key of the nearest cached location, 0 disables it
+        self.location_near_radius = settings.location_cache_near_radius
+
+    def _flight_calls(self, fetch: typing.Callable, check: typing.Callable) -> typing.Tuple[typing.Callable, ...]:
+        """
+        `fn` and `check` of a flight, run by a service with its own unit of work created once the call starts.
+        The flight task outlives the request and its unit of work when it refreshes in the background
+        or when the caller goes away
+        :param fetch: coroutine function of the service making the upstream call
+        :param check: function of the service returning the cached result
+        :return:
+        """
+        services = []
+
+        def service() -> 'WeatherService':
+            if not services:
+                services.append(WeatherService(uow=inject.instance(UnitOfWork), backend=self.backend,
+                                               flights=self.flights, quantizer=self.quantizer,
+                                               cache_policy=self.cache_policy))
+            return services[0]
+
+        return lambda: fetch(service()), lambda: check(service())
+
+    def _usable(self, type_, data: domain.CachedData, fresh: bool = False) -> bool:
+        """
+        Whether the cached record can be served
+        :param type_:
+        :param data:
+        :param fresh: bool: refuse the stale records
+        :return:
+        """
+        state = self.cache_policy.state(type_, data.modified_at)
+        return state == STATE_FRESH or (not fresh and state == STATE_STALE)
 
-    def find_location_key(self, lat, lon):
+    def find_cached_location(self, lat, lon, cell: str = None, fresh: bool = False):
         with self.uow:
-            key_ = None
-            data = self.uow.cache.find_location(lat, lon)
-            if data:
-                data = domain.CachedLocation.from_orm(data)
-                key_ = data.location_key
-            if not key_:
-                # No valid cache record found so calling API
-                resp = self.backend.get_location_key(lat, lon)
-                if resp:
-                    data = domain.CachedLocation(
-                        **{
-                            'latitude': lat,
-                            'longitude': lon,
-                            'response': resp
-                        }
-                    )
-                    key_ = data.location_key
-                    self.uow.cache.cache_location(data.dict())
-            return key_
-
-    def get_daily_forecast(self, lat, lon):
-        key_ = self.find_location_key(lat, lon)
-        if key_:
+            data = self.uow.cache.find_location(cell or self.quantizer.cell(lat, lon))
+            if not data and self.location_near_radius:
+                data = self.uow.cache.find_nearest_location(geo_point(lat, lon), self.location_near_radius)
+        if data:
+            data = domain.CachedLocation.parse_obj(data)
+            if self._usable(CACHE_LOCATION, data, fresh=fresh):
+                return data
+
+    def find_cached_location_key(self, lat, lon, cell: str = None, fresh: bool = False):
+        data = self.find_cached_location(lat, lon, cell=cell, fresh=fresh)
+        if data:
+            return data.location_key
+
+    async def fetch_location_key(self, lat, lon, cell: str = None):
+        # Out of the unit of work to not hold its DB connection while waiting
+        resp = await self.backend.get_location_key(lat, lon)
+        if resp:
+            data = domain.CachedLocation(
+                **{
+                    'latitude': lat,
+                    'longitude': lon,
+                    'cell': cell,
+                    'point': geo_point(lat, lon),
+                    'response': resp
+                }
+            )
+            data.expires_at = self.cache_policy.expires_at(CACHE_LOCATION, data.modified_at)
             with self.uow:
-                data = self.uow.cache.find_forecast(key_, 'DAILY')
-                if data:
-                    data = domain.CachedForcast.from_orm(data)
-                if not data:
-                    resp = self.backend.get_daily_forecast(key_)
-                    if resp:
-                        data = domain.CachedForcast(**{
-                            'location_key': key_,
-                            'type': 'DAILY',
-                            'response': resp
-                        })
-                        self.uow.cache.cache_forecast(data.dict())
-                if data:
-                    return data.response
-
-    def get_hourly_forecast(self, lat, lon):
-        key_ = self.find_location_key(lat, lon)
-        if key_:
+                self.uow.cache.cache_location(data.dict())
+            return data.location_key
+
+    async def find_location_key(self, lat, lon):
+        # Nearby coordinates share the cached location of their cell
+        cell = self.quantizer.cell(lat, lon)
+        flight = f'location:{cell}'
+        data = self.find_cached_location(lat, lon, cell)
+        key_ = data.location_key if data else None
+        if key_ and self.cache_policy.state(CACHE_LOCATION, data.modified_at) == STATE_STALE:
+            # Served stale, refreshed in the background
+            self.flights.start(flight, *self._flight_calls(
+                lambda service: service.fetch_location_key(lat, lon, cell),
+                lambda service: service.find_cached_location_key(lat, lon, cell, fresh=True)
+            ))
+        if not key_:
+            # No valid cache record found so calling API, once for all the concurrent requests of the cell
+            key_ = await self.flights.do(flight, *self._flight_calls(
+                lambda service: service.fetch_location_key(lat, lon, cell),
+                lambda service: service.find_cached_location_key(lat, lon, cell, fresh=True)
+            ))
+        return key_
+
+    def find_cached_forecast(self, key_, type_, fresh: bool = False):
+        with self.uow:
+            data = self.uow.cache.find_forecast(key_, type_)
+        if data:
+            data = domain.CachedForcast.parse_obj(data)
+            if self._usable(type_, data, fresh=fresh):
+                return data
+
+    async def fetch_forecast(self, key_, type_):
+        if type_ == 'DAILY':
+            resp = await self.backend.get_daily_forecast(key_)
+        else:
+            resp = await self.backend.get_hourly_forecast(key_)
+        if resp:
+            data = domain.CachedForcast(**{
+                'location_key': key_,
+                'type': type_,
+                'response': resp
+            })
+            data.expires_at = self.cache_policy.expires_at(type_, data.modified_at)
             with self.uow:
-                data = self.uow.cache.find_forecast(key_, 'HOURLY')
-                if data:
-                    data = domain.CachedForcast.from_orm(data)
-                if not data:
-                    resp = self.backend.get_hourly_forecast(key_)
-                    if resp:
-                        data = domain.CachedForcast(**{
-                            'location_key': key_,
-                            'type': 'HOURLY',
-                            'response': resp
-                        })
-                        self.uow.cache.cache_forecast(data.dict())
-                if data:
-                    return data.response
+                self.uow.cache.cache_forecast(data.dict())
+            return data
+
+    async def get_forecast(self, key_, type_):
+        flight = f'forecast:{key_}:{type_}'
+        data = self.find_cached_forecast(key_, type_)
+        if data and self.cache_policy.state(type_, data.modified_at) == STATE_STALE:
+            # Served stale, refreshed in the background
+            self.flights.start(flight, *self._flight_calls(
+                lambda service: service.fetch_forecast(key_, type_),
+                lambda service: service.find_cached_forecast(key_, type_, fresh=True)
+            ))
+        if not data:
+            data = await self.flights.do(flight, *self._flight_calls(
+                lambda service: service.fetch_forecast(key_, type_),
+                lambda service: service.find_cached_forecast(key_, type_, fresh=True)
+            ))
+        if data:
+            return data.response
+
+    async def get_daily_forecast(self, lat, lon):
+        key_ = await self.find_location_key(lat, lon)
+        if key_:
+            return await self.get_forecast(key_, 'DAILY')
+
+    async def get_hourly_forecast(self, lat, lon):
+        key_ = await self.find_location_key(lat, lon)
+        if key_:
+            return await self.get_forecast(key_, 'HOURLY')